@@ -3,13 +3,20 @@ import json
 import joblib
 import pandas as pd
 import numpy as np
+import time
 import logging
+import functools
 
 from fastapi import FastAPI, HTTPException, Security
 from fastapi.security import APIKeyHeader
 
-from src.feature_engineering import add_features
-from src.pydantic_validaton import InputData, RecommendInput
+from src.feature_engineering import prepare_features as _prepare_features
+from src.pydantic_validaton import InputData, RecommendInput, OptimizeInput
+from src.portfolio_optimizer import PredictionCache, optimize_portfolio
+from src.request_logging import create_request_logger
+from src.admission import (
+    INTERACTIVE, BULK, KeyRegistry, PriorityScheduler, RateLimited, Overloaded
+)
 
 
 # ============================================================
@@ -22,12 +29,16 @@ logging.basicConfig(
 
 logger = logging.getLogger("agri-api")
 
+# logs des requêtes (hot path) : mis en file puis écrits par un thread dédié
+request_logger = create_request_logger(logging.getLogger("agri-api.requests"))
+
 
 # ============================================================
 # CONFIGURATION DE LA SÉCURITÉ
 
-API_KEY = os.getenv("API_KEY")
-if not API_KEY:
+# API_KEY (clé historique) et/ou API_KEYS (plusieurs clés avec leurs limites)
+api_keys = KeyRegistry.from_env()
+if not api_keys.clients:
     logger.error("La variable d'environnement API_KEY n'est pas définie !")
     raise RuntimeError("API_KEY manquante dans les variables d'environnement")
 
@@ -35,10 +46,29 @@ api_key_header = APIKeyHeader(name="x-api-key")
 
 
 def _verify_api_key(x_api_key: str = Security(api_key_header)):
-    """Sécurité pour l'endpoint predict"""
-    if x_api_key != API_KEY:
-        logger.warning("Tentative d'accès avec une API key invalide")
+    """Sécurité pour les endpoints de prédiction : renvoie le client associé à la clé"""
+    client = api_keys.get(x_api_key)
+    if client is None:
+        request_logger.warning("auth", "Tentative d'accès avec une API key invalide")
         raise HTTPException(status_code=401, detail="Invalid API key")
+    return client
+
+
+def _admit(client, endpoint, cost):
+    """Débite le coût de la requête (en nombre de lignes évaluées) sur le seau de la clé"""
+    try:
+        client.admit(cost)
+    except RateLimited as rl:
+        request_logger.warning(endpoint, "Limite de débit atteinte", client=client.name, cost=cost)
+        raise HTTPException(status_code=429, detail=str(rl),
+                            headers={"Retry-After": str(max(1, round(rl.retry_after)))})
+
+
+# ============================================================
+# ORDONNANCEMENT DES PRÉDICTIONS
+# les prédictions tournent sur un pool de threads, la voie interactive d'abord
+
+scheduler = PriorityScheduler.from_env()
 
 
 # ============================================================
@@ -82,22 +112,11 @@ app.AREAS = AREAS
 # Fontion de utilitaires 
 # preparation des données
 def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
-    # Transformation log1p
-    df["pesticides_tonnes_log"] = np.log1p(df["pesticides_tonnes"])
-    df.drop(columns=["pesticides_tonnes"], inplace=True)
-    logger.info("Transformation log1p appliquée.")
-
-    # Ajout du cluster climatique
-    df["climate_cluster"] = df["Area"].map(country_to_cluster)
-    if df["climate_cluster"].isna().any():
-        logger.warning(f"Pays inconnu : {df['Area'].iloc[0]}")
-        raise ValueError(f"Pays inconnu : {df['Area'].iloc[0]}")
-
-    # Feature engineering
-    df = add_features(df)
-    logger.info("Feature engineering terminé.")
-
-    return df
+    try:
+        return _prepare_features(df, country_to_cluster)
+    except ValueError as ve:
+        request_logger.warning("features", str(ve))
+        raise
 
 # prediction
 def predict_single(df: pd.DataFrame) -> float:
@@ -105,23 +124,41 @@ def predict_single(df: pd.DataFrame) -> float:
     pred_log = app.model.predict(df_prepared)[0]
 
     pred = float(np.expm1(pred_log))
-    logger.info(f"Prédiction effectuée : {pred}")
     return pred
 
+# recommandation : une prédiction par culture
+def recommend_all(inputs: dict) -> dict:
+    results = {}
+    for item in app.ITEMS:
+        row = dict(inputs)
+        # injectons la culture
+        row['Item'] = item
+        df = pd.DataFrame([row])
+        results[item] = predict_single(df)
+    return results
+
+# prediction vectorisée (un seul appel au modèle pour tout le batch)
+def predict_batch(df: pd.DataFrame) -> np.ndarray:
+    df_prepared = prepare_features(df)
+    return np.expm1(app.model.predict(df_prepared))
+
+# cache des prédictions partagé par les optimisations successives
+prediction_cache = PredictionCache()
+
 
 # ============================================================
 # ENDPOINTS
 
 @app.get("/")
 async def home():
-    logger.info("Endpoint / appelé")
+    request_logger.info("home", "Endpoint / appelé")
     return {"message": "Bienvenue sur l'API de prédiction agricole"}
 
 
 @app.get("/config")
 async def get_config():
     """Retourne les listes de pays et de cultures pour le frontend"""
-    logger.info("Endpoint /config appelé")
+    request_logger.info("config", "Endpoint /config appelé")
     return {
         "items": ITEMS,
         "areas": AREAS,
@@ -131,21 +168,32 @@ async def get_config():
 
 @app.get("/model_info")
 async def model_info():
-    logger.info("Endpoint /model_info appelé")
+    request_logger.info("model_info", "Endpoint /model_info appelé")
     return metadata
 
 
 
 @app.post("/predict")
-async def predict_agro(data: InputData, _: str = Security(_verify_api_key)):
+async def predict_agro(data: InputData, client = Security(_verify_api_key)):
+    cost = 1
+    _admit(client, "predict", cost)
     try:
-        logger.info(f"Requête reçue : {data.model_dump()}")
+        start = time.perf_counter()
+        row = data.model_dump()
         # Conversion en DataFrame
-        df = pd.DataFrame([data.model_dump()])
-        logger.info("Conversion en DataFrame effectuée.")
-        pred = predict_single(df)
+        df = pd.DataFrame([row])
+        pred = await scheduler.run(client.lane_for(INTERACTIVE), predict_single, df)
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        request_logger.info("predict", "Prédiction effectuée", input=row, prediction=pred, latency_ms=latency_ms)
+        request_logger.audit("predict", row, pred, latency_ms)
         return {"prediction (hg/ha)": pred}
 
+    except Overloaded as oe:
+        # le travail n'a jamais tourné : le coût est rendu à la clé
+        client.refund(cost)
+        raise HTTPException(status_code=503, detail=str(oe), headers={"Retry-After": "1"})
+
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
 
@@ -158,20 +206,62 @@ async def predict_agro(data: InputData, _: str = Security(_verify_api_key)):
 
 #---------------------------------------------------------------------
 @app.post('/recommend')
-async def recommandation(data: RecommendInput, _:str = Security(_verify_api_key)):
+async def recommandation(data: RecommendInput, client = Security(_verify_api_key)):
+    # une recommandation coûte une prédiction par culture
+    cost = len(app.ITEMS)
+    _admit(client, "recommend", cost)
     try:
-        logger.info(f"Requête reçue : {data.model_dump()}")
-        results = {}
-        for item in app.ITEMS:
-            row = data.model_dump()
-            # injectons la culture
-            row['Item'] = item
-            df = pd.DataFrame([row])
-
-            pred = predict_single(df)
-            results[item] = pred
-        
+        start = time.perf_counter()
+        inputs = data.model_dump()
+        results = await scheduler.run(client.lane_for(BULK), recommend_all, inputs)
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        request_logger.info("recommend", "Recommandation effectuée", input=inputs, latency_ms=latency_ms)
+        request_logger.audit("recommend", inputs, results, latency_ms)
         return {"recommendations": results}
+    except Overloaded as oe:
+        client.refund(cost)
+        raise HTTPException(status_code=503, detail=str(oe), headers={"Retry-After": "1"})
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    except KeyError as ke:
+        raise HTTPException(status_code=422, detail=f"Colonne manquante : {ke}")
+    except Exception:
+        raise HTTPException(status_code=500, detail="Erreur interne")
+
+
+#---------------------------------------------------------------------
+@app.post('/optimize')
+async def optimisation(data: OptimizeInput, client = Security(_verify_api_key)):
+    items = data.items or app.ITEMS
+    # coût = taille de la grille scénario x culture x pesticides
+    cost = len(data.scenarios) * len(items) * len(data.pesticide_levels)
+    _admit(client, "optimize", cost)
+    try:
+        min_shares = [data.min_share_by_item.get(item, data.min_share) for item in items]
+
+        job = functools.partial(
+            optimize_portfolio,
+            area=data.Area,
+            year=data.Year,
+            scenarios=[s.model_dump() for s in data.scenarios],
+            items=items,
+            pesticide_levels=data.pesticide_levels,
+            pesticide_budget=data.pesticide_budget,
+            min_shares=min_shares,
+            predict_fn=predict_batch,
+            risk_aversion=data.risk_aversion,
+            total_area_ha=data.total_area_ha,
+            cache=prediction_cache,
+        )
+        result = await scheduler.run(client.lane_for(BULK), job)
+        request_logger.info("optimize", "Optimisation effectuée", Area=data.Area,
+                            n_scenarios=len(data.scenarios), total_ms=result["stats"]["total_ms"])
+        return result
+    except Overloaded as oe:
+        client.refund(cost)
+        raise HTTPException(status_code=503, detail=str(oe), headers={"Retry-After": "1"})
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
 
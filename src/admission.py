@@ -0,0 +1,220 @@
+import os
+import json
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from concurrent.futures import Future
+
+
+# ============================================================
+# VOIES DE PRIORITÉ
+# Une requête interactive (/predict) passe toujours devant le travail de masse
+# (/recommend, /optimize, ou toute requête d'une clé déclarée "bulk").
+
+INTERACTIVE = 0
+BULK = 1
+LANES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+
+class RateLimited(Exception):
+    """Budget de la clé épuisé (HTTP 429)"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Limite de débit atteinte, réessayer dans {retry_after:.1f} s")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """File de la voie pleine (HTTP 503)"""
+
+
+# ============================================================
+# LIMITATION DE DÉBIT PAR CLÉ
+
+class TokenBucket:
+    """Seau à jetons : rate unités/s, au plus capacity unités accumulées.
+
+    Une requête plus coûteuse que la capacité passe quand le seau est plein
+    mais débite son coût complet : le seau passe en négatif et la requête
+    suivante attend que la dette soit remboursée (cost / rate), si bien que
+    le débit moyen d'une clé ne dépasse jamais rate.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, cost) -> float:
+        """Consomme cost jetons ; renvoie 0 si accepté, sinon l'attente nécessaire en s"""
+        cost = float(cost)
+        # au-delà de la capacité, on exige un seau plein puis on s'endette
+        required = min(cost, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= required:
+                self.tokens -= cost
+                return 0.0
+            return (required - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def refund(self, cost):
+        """Rend cost jetons (requête acceptée mais jamais exécutée)"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + float(cost))
+
+
+class ApiClient:
+    def __init__(self, name, rate=None, burst=None, lane=INTERACTIVE):
+        self.name = name
+        self.lane = lane
+        # rate=None : pas de limite
+        self.bucket = TokenBucket(rate, burst or rate) if rate else None
+
+    def lane_for(self, lane):
+        """Une clé "bulk" envoie tout son trafic dans la voie de masse"""
+        return max(lane, self.lane)
+
+    def admit(self, cost):
+        if self.bucket is None:
+            return
+        wait = self.bucket.try_acquire(cost)
+        if wait > 0:
+            raise RateLimited(wait)
+
+    def refund(self, cost):
+        if self.bucket is not None:
+            self.bucket.refund(cost)
+
+
+class KeyRegistry:
+    def __init__(self, clients):
+        self.clients = clients
+
+    def get(self, key):
+        return self.clients.get(key) if key else None
+
+    @classmethod
+    def from_env(cls):
+        """Construit le registre depuis l'environnement.
+
+        API_KEY                      clé historique (voie interactive, frontend), sans limite
+                                     sauf si RATE_LIMIT est défini explicitement
+        API_KEYS                     JSON {"clé": {"name": ..., "rate": 20, "burst": 100, "lane": "bulk"}}
+        RATE_LIMIT / RATE_BURST      limites par défaut (unités de coût par seconde / rafale)
+        """
+        explicit_rate = os.getenv("RATE_LIMIT")
+        default_rate = float(explicit_rate or "50")
+        default_burst = float(os.getenv("RATE_BURST", "200"))
+
+        clients = {}
+        api_key = os.getenv("API_KEY")
+        if api_key:
+            if explicit_rate:
+                clients[api_key] = ApiClient("default", default_rate, default_burst)
+            else:
+                clients[api_key] = ApiClient("default")
+
+        for key, conf in json.loads(os.getenv("API_KEYS") or "{}").items():
+            lane = conf.get("lane", "interactive")
+            if lane not in LANES:
+                raise ValueError(f"Voie inconnue pour la clé {conf.get('name', '?')} : {lane}")
+            clients[key] = ApiClient(
+                conf.get("name", key[:4] + "…"),
+                conf.get("rate", default_rate),
+                conf.get("burst", default_burst),
+                LANES[lane],
+            )
+        return cls(clients)
+
+
+# ============================================================
+# ORDONNANCEUR À PRIORITÉS
+
+class PriorityScheduler:
+    """Exécute les prédictions sur un pool de threads, voie interactive d'abord.
+
+    Chaque voie a une file bornée : au-delà, submit lève Overloaded plutôt
+    que d'accumuler de la latence. Au sein d'une voie l'ordre est FIFO.
+    Au plus workers - 1 tâches de masse tournent en même temps : un worker
+    reste toujours libre pour la voie interactive (avec workers=1, un
+    second thread lui est réservé).
+    """
+
+    def __init__(self, workers=2, max_queued=None):
+        self.workers = workers
+        self.bulk_slots = max(1, workers - 1)
+        self.max_queued = max_queued or {INTERACTIVE: 64, BULK: 16}
+        self.queued = {lane: 0 for lane in self.max_queued}
+        self.running_bulk = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.getenv("INFERENCE_WORKERS", "2")),
+            max_queued={
+                INTERACTIVE: int(os.getenv("MAX_INTERACTIVE_QUEUE", "64")),
+                BULK: int(os.getenv("MAX_BULK_QUEUE", "16")),
+            },
+        )
+
+    def submit(self, lane, fn, *args) -> Future:
+        future = Future()
+        with self._cond:
+            if self.queued[lane] >= self.max_queued[lane]:
+                raise Overloaded("Serveur surchargé, réessayer plus tard")
+            self.queued[lane] += 1
+            heapq.heappush(self._heap, (lane, next(self._seq), fn, args, future))
+            if len(self._threads) < max(self.workers, self.bulk_slots + 1):
+                self._start_worker()
+            self._cond.notify_all()
+        return future
+
+    async def run(self, lane, fn, *args):
+        return await asyncio.wrap_future(self.submit(lane, fn, *args))
+
+    def _start_worker(self):
+        thread = threading.Thread(target=self._work, name=f"inference-{len(self._threads)}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _can_take(self):
+        # le tas est trié par voie : en tête de masse, aucune requête interactive n'attend
+        if not self._heap:
+            return False
+        return self._heap[0][0] == INTERACTIVE or self.running_bulk < self.bulk_slots
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._can_take():
+                    self._cond.wait()
+                lane, _, fn, args, future = heapq.heappop(self._heap)
+                self.queued[lane] -= 1
+                if lane == BULK:
+                    self.running_bulk += 1
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            if lane == BULK:
+                with self._cond:
+                    self.running_bulk -= 1
+                    self._cond.notify_all()
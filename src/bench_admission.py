@@ -0,0 +1,111 @@
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from src.admission import INTERACTIVE, BULK, PriorityScheduler, Overloaded
+
+
+# ============================================================
+# BENCHMARK : LATENCE INTERACTIVE SOUS UN FLOOD DE REQUÊTES DE MASSE
+#   python -m src.bench_admission
+#
+# Le temps de service est simulé (time.sleep) : une prédiction interactive
+# coûte --predict-ms, une requête de masse coûte --bulk-cost fois plus.
+# Par défaut 190 x 2 ms = 380 ms, le temps d'un /optimize à cache vide
+# (100 scénarios, mesuré par src.bench_optimizer) ; --bulk-cost 10 simule
+# plutôt un /recommend. Le flood de masse arrive plus vite que le pool ne
+# peut le servir.
+
+def _sleep_job(ms):
+    time.sleep(ms / 1000)
+
+
+def _open_loop(scheduler, lane, rate, duration, service_ms, latencies, shed):
+    """Soumet des requêtes à débit constant et mesure leur latence de bout en bout"""
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    n = 0
+    while True:
+        target = start + n * interval
+        now = time.perf_counter()
+        if target - start >= duration:
+            break
+        if target > now:
+            time.sleep(target - now)
+        submitted = time.perf_counter()
+        try:
+            future = scheduler.submit(lane, _sleep_job, service_ms)
+            future.add_done_callback(lambda _, t=submitted: latencies.append((time.perf_counter() - t) * 1000))
+        except Overloaded:
+            shed.append(1)
+        n += 1
+
+
+def run_scenario(name, priority, flood, args):
+    bulk_lane = BULK if priority else INTERACTIVE
+    max_queued = {INTERACTIVE: args.max_interactive_queue, BULK: args.max_bulk_queue}
+    if not priority:
+        # FIFO : une seule file partagée, de la taille des deux files réunies
+        max_queued = {INTERACTIVE: args.max_interactive_queue + args.max_bulk_queue, BULK: 0}
+    scheduler = PriorityScheduler(workers=args.workers, max_queued=max_queued)
+
+    interactive, interactive_shed = [], []
+    bulk, bulk_shed = [], []
+    threads = [threading.Thread(target=_open_loop, args=(
+        scheduler, INTERACTIVE, args.interactive_rate, args.duration, args.predict_ms,
+        interactive, interactive_shed))]
+    if flood:
+        threads.append(threading.Thread(target=_open_loop, args=(
+            scheduler, bulk_lane, args.bulk_rate, args.duration, args.predict_ms * args.bulk_cost,
+            bulk, bulk_shed)))
+
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # laisse la file se vider
+    time.sleep(args.predict_ms * args.bulk_cost * (args.max_bulk_queue + 2) / 1000)
+
+    lat = np.asarray(interactive)
+    return {
+        "scenario": name,
+        "p50": float(np.percentile(lat, 50)) if lat.size else float("nan"),
+        "p99": float(np.percentile(lat, 99)) if lat.size else float("nan"),
+        "interactive_ok": len(interactive),
+        "interactive_shed": len(interactive_shed),
+        "bulk_ok": len(bulk),
+        "bulk_shed": len(bulk_shed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latence interactive sous flood de masse")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durée de chaque scénario (s)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--predict-ms", type=float, default=2.0, help="Temps d'une prédiction")
+    parser.add_argument("--bulk-cost", type=int, default=190,
+                        help="Temps d'une requête de masse, en prédictions (190 : /optimize, 10 : /recommend)")
+    parser.add_argument("--interactive-rate", type=float, default=100.0, help="Requêtes interactives/s")
+    parser.add_argument("--bulk-rate", type=float, default=10.0, help="Requêtes de masse/s")
+    parser.add_argument("--max-interactive-queue", type=int, default=64)
+    parser.add_argument("--max-bulk-queue", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    results = [
+        run_scenario("sans flood", priority=True, flood=False, args=args),
+        run_scenario("flood, file FIFO", priority=False, flood=True, args=args),
+        run_scenario("flood, voies prioritaires", priority=True, flood=True, args=args),
+    ]
+
+    print(f"{'scénario':<28}{'p50 (ms)':>10}{'p99 (ms)':>10}{'inter. ok/rejet':>18}{'masse ok/rejet':>18}")
+    for r in results:
+        print(f"{r['scenario']:<28}{r['p50']:>10.1f}{r['p99']:>10.1f}"
+              f"{str(r['interactive_ok']) + '/' + str(r['interactive_shed']):>18}"
+              f"{str(r['bulk_ok']) + '/' + str(r['bulk_shed']):>18}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
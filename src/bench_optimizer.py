@@ -0,0 +1,106 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import INPUT_COLUMNS, prepare_features
+from src.portfolio_optimizer import PredictionCache, optimize_portfolio
+
+
+# ============================================================
+# BENCHMARK : TEMPS DE RÉPONSE DE /optimize
+#   API_KEY=... python -m src.bench_optimizer          # modèle réel (artefacts LFS)
+#   python -m src.bench_optimizer --synthetic           # forêt de même configuration
+#
+# Mesure optimize_portfolio (grille + programme linéaire) pour --scenarios
+# scénarios x toutes les cultures x --levels niveaux de pesticides, cache vide
+# (premier appel) puis cache chaud (même requête rejouée).
+
+def _synthetic_model(n_estimators, n_rows=28_000, n_areas=101, n_items=10, seed=44):
+    """Forêt entraînée sur des données aléatoires, hyperparamètres du notebook de modélisation"""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    areas = [f"Area_{i}" for i in range(n_areas)]
+    items = [f"Item_{i}" for i in range(n_items)]
+    country_to_cluster = {a: int(rng.integers(0, 4)) for a in areas}
+
+    X = pd.DataFrame({
+        "Area": rng.choice(areas, n_rows),
+        "Item": rng.choice(items, n_rows),
+        "Year": rng.integers(1990, 2014, n_rows),
+        "average_rain_fall_mm_per_year": rng.uniform(50, 3500, n_rows),
+        "avg_temp": rng.uniform(1, 30, n_rows),
+        "pesticides_tonnes": np.expm1(rng.uniform(0, 12, n_rows)),
+    }, columns=INPUT_COLUMNS)
+    y = np.log1p(rng.uniform(5e3, 5e5, n_rows))
+    X = prepare_features(X, country_to_cluster)
+
+    cat_vars = ["Area", "Item"]
+    num_vars = [c for c in X.columns if c not in cat_vars]
+    model = Pipeline(steps=[
+        ("preprocess", ColumnTransformer(transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore", drop="first"), cat_vars),
+            ("num", StandardScaler(), num_vars),
+        ])),
+        ("estimator", RandomForestRegressor(n_estimators=n_estimators, bootstrap=False, max_depth=30,
+                                            max_features=0.5, min_samples_split=5, random_state=seed,
+                                            n_jobs=-1)),
+    ])
+    model.fit(X, y)
+
+    def predict(df):
+        return np.expm1(model.predict(prepare_features(df.copy(), country_to_cluster)))
+
+    return predict, areas[0], items
+
+
+def _app_model():
+    import app
+    return app.predict_batch, app.AREAS[0], app.ITEMS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temps de réponse de l'optimiseur de portefeuille")
+    parser.add_argument("--scenarios", type=int, default=100)
+    parser.add_argument("--levels", type=int, default=5, help="Niveaux de pesticides candidats")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic", action="store_true", help="Forêt synthétique au lieu du modèle réel")
+    parser.add_argument("--trees", type=int, default=800, help="Arbres de la forêt synthétique")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        print(f"Entraînement de la forêt synthétique ({args.trees} arbres)...")
+        predict_fn, area, items = _synthetic_model(args.trees)
+    else:
+        predict_fn, area, items = _app_model()
+
+    rng = np.random.default_rng(0)
+    levels = np.linspace(0, 1000, args.levels).tolist()
+    kwargs = dict(area=area, year=2020, items=items, pesticide_levels=levels,
+                  pesticide_budget=400.0, min_shares=[0.02] * len(items),
+                  predict_fn=predict_fn, risk_aversion=0.5)
+
+    cold, warm, predict = [], [], []
+    for _ in range(args.repeat):
+        scenarios = [{"average_rain_fall_mm_per_year": float(r), "avg_temp": float(t)}
+                     for r, t in zip(rng.uniform(200, 2500, args.scenarios), rng.uniform(5, 30, args.scenarios))]
+        cache = PredictionCache()
+        result = optimize_portfolio(scenarios=scenarios, cache=cache, **kwargs)
+        cold.append(result["stats"]["total_ms"])
+        predict.append(result["stats"]["predict_ms"])
+        warm.append(optimize_portfolio(scenarios=scenarios, cache=cache, **kwargs)["stats"]["total_ms"])
+
+    n_rows = args.scenarios * len(items) * args.levels
+    print(f"{args.scenarios} scénarios x {len(items)} cultures x {args.levels} niveaux = {n_rows} lignes")
+    print(f"  cache vide  : p50={np.median(cold):.0f} ms max={max(cold):.0f} ms "
+          f"(dont prédiction p50={np.median(predict):.0f} ms)")
+    print(f"  cache chaud : p50={np.median(warm):.0f} ms max={max(warm):.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,36 @@
+import numpy as np
+
+
+# Ordre des colonnes attendu par le pipeline (identique à InputData)
+INPUT_COLUMNS = [
+    "Area",
+    "Item",
+    "Year",
+    "average_rain_fall_mm_per_year",
+    "avg_temp",
+    "pesticides_tonnes",
+]
+
+
 def add_features(df):
     df['water_stress'] = df['average_rain_fall_mm_per_year'] / df['avg_temp']
     df["rain_temp_interaction"] = df['average_rain_fall_mm_per_year'] * df['avg_temp']
     df["input_intensity"] = df["pesticides_tonnes_log"] / df["average_rain_fall_mm_per_year"]
     df["pest_temp_interaction"] = df["pesticides_tonnes_log"] * df["avg_temp"]
-    return df
\ No newline at end of file
+    return df
+
+
+def prepare_features(df, country_to_cluster):
+    """Prépare les entrées brutes pour le modèle (log1p, cluster climatique, interactions)"""
+    # Transformation log1p
+    df["pesticides_tonnes_log"] = np.log1p(df["pesticides_tonnes"])
+    df.drop(columns=["pesticides_tonnes"], inplace=True)
+
+    # Ajout du cluster climatique
+    df["climate_cluster"] = df["Area"].map(country_to_cluster)
+    unknown = df["climate_cluster"].isna()
+    if unknown.any():
+        raise ValueError(f"Pays inconnu : {df.loc[unknown, 'Area'].iloc[0]}")
+
+    # Feature engineering
+    return add_features(df)
@@ -0,0 +1,365 @@
+import json
+import time
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from src.feature_engineering import INPUT_COLUMNS, add_features
+
+
+# ============================================================
+# GÉNÉRATION DU JEU D'ENTRÉES DE RÉFÉRENCE
+
+# valeurs limites ajoutées dans chaque strate (Area x Item)
+EDGE_CASES = [
+    {"Year": 2000, "average_rain_fall_mm_per_year": 0.0, "avg_temp": 20.0, "pesticides_tonnes": 100.0},
+    {"Year": 2000, "average_rain_fall_mm_per_year": 0.0, "avg_temp": 20.0, "pesticides_tonnes": 0.0},
+    {"Year": 2000, "average_rain_fall_mm_per_year": 1000.0, "avg_temp": -10.0, "pesticides_tonnes": 100.0},
+    {"Year": 2000, "average_rain_fall_mm_per_year": 1000.0, "avg_temp": 0.0, "pesticides_tonnes": 100.0},
+    {"Year": 2000, "average_rain_fall_mm_per_year": 1000.0, "avg_temp": 20.0, "pesticides_tonnes": 0.0},
+    {"Year": 2000, "average_rain_fall_mm_per_year": 1000.0, "avg_temp": 20.0, "pesticides_tonnes": 1e9},
+    {"Year": 1900, "average_rain_fall_mm_per_year": 5000.0, "avg_temp": 45.0, "pesticides_tonnes": 1.0},
+    {"Year": 2050, "average_rain_fall_mm_per_year": 1.0, "avg_temp": -30.0, "pesticides_tonnes": 1e6},
+]
+
+
+def generate_golden_inputs(areas, items, samples_per_stratum=8, seed=0) -> pd.DataFrame:
+    """Génère un jeu d'entrées stratifié sur toutes les paires (Area, Item).
+
+    Chaque strate reçoit samples_per_stratum tirages aléatoires (graine fixe)
+    couvrant les plages usuelles, plus les valeurs limites de EDGE_CASES.
+    """
+    rng = np.random.default_rng(seed)
+    n_strata = len(areas) * len(items)
+    n_edges = len(EDGE_CASES)
+    per_stratum = samples_per_stratum + n_edges
+
+    area_idx = np.repeat(np.arange(len(areas)), len(items) * per_stratum)
+    item_idx = np.tile(np.repeat(np.arange(len(items)), per_stratum), len(areas))
+
+    size = (n_strata, samples_per_stratum)
+    random_part = {
+        "Year": rng.integers(1990, 2031, size=size),
+        "average_rain_fall_mm_per_year": rng.uniform(50.0, 3500.0, size=size),
+        "avg_temp": rng.uniform(-5.0, 35.0, size=size),
+        # pesticides répartis uniformément en échelle log
+        "pesticides_tonnes": np.expm1(rng.uniform(0.0, np.log1p(1e6), size=size)),
+    }
+
+    columns = {}
+    for col in INPUT_COLUMNS[2:]:
+        edges = np.array([e[col] for e in EDGE_CASES])
+        block = np.hstack([random_part[col], np.tile(edges, (n_strata, 1))])
+        columns[col] = block.ravel()
+
+    return pd.DataFrame({
+        "Area": np.asarray(areas, dtype=object)[area_idx],
+        "Item": np.asarray(items, dtype=object)[item_idx],
+        "Year": columns["Year"].astype(int),
+        "average_rain_fall_mm_per_year": columns["average_rain_fall_mm_per_year"].astype(float),
+        "avg_temp": columns["avg_temp"].astype(float),
+        "pesticides_tonnes": columns["pesticides_tonnes"].astype(float),
+    }, columns=INPUT_COLUMNS)
+
+
+# ============================================================
+# PRÉDICTIONS TOLÉRANTES AUX ERREURS
+
+def _derived_features(df):
+    """Features numériques dérivées (sans le cluster), ou None si les colonnes manquent"""
+    cols = ["average_rain_fall_mm_per_year", "avg_temp", "pesticides_tonnes"]
+    if not set(cols).issubset(df.columns):
+        return None
+    num = pd.DataFrame({
+        "average_rain_fall_mm_per_year": df["average_rain_fall_mm_per_year"].to_numpy(dtype=float),
+        "avg_temp": df["avg_temp"].to_numpy(dtype=float),
+    })
+    with np.errstate(all="ignore"):
+        num["pesticides_tonnes_log"] = np.log1p(df["pesticides_tonnes"].to_numpy(dtype=float))
+        return add_features(num).to_numpy(dtype=float)
+
+
+def non_finite_feature_rows(df) -> np.ndarray:
+    """Lignes dont les features dérivées ne sont pas finies (ex : pluie ou température nulle)"""
+    feats = _derived_features(df)
+    if feats is None:
+        return np.zeros(len(df), dtype=bool)
+    return ~np.isfinite(feats).all(axis=1)
+
+
+def infinite_feature_rows(df) -> np.ndarray:
+    """Lignes dont une feature dérivée est infinie (rejetées par le pipeline, contrairement aux NaN)"""
+    feats = _derived_features(df)
+    if feats is None:
+        return np.zeros(len(df), dtype=bool)
+    return np.isinf(feats).any(axis=1)
+
+
+def _finite_or_nan(preds):
+    preds = np.asarray(preds, dtype=float)
+    return np.where(np.isfinite(preds), preds, np.nan)
+
+
+def _predict_bisect(predict_fn, df) -> np.ndarray:
+    """Prédit df en coupant récursivement en deux les batches qui échouent"""
+    try:
+        return _finite_or_nan(predict_fn(df.copy()))
+    except Exception:
+        if len(df) == 1:
+            return np.array([np.nan])
+    mid = len(df) // 2
+    return np.concatenate([_predict_bisect(predict_fn, df.iloc[:mid]),
+                           _predict_bisect(predict_fn, df.iloc[mid:])])
+
+
+def predict_rows_safe(predict_fn, df, timings=None) -> np.ndarray:
+    """Prédit df ; les lignes qui lèvent une erreur valent NaN.
+
+    Les lignes aux features finies sont prédites en un batch ; en cas d'échec
+    inattendu (ex : pays inconnu) le batch est coupé en deux récursivement pour
+    isoler les lignes fautives. Les lignes aux features non finies sont
+    évaluées à part : celles à features NaN (acceptées par le pipeline, ex :
+    pluie et pesticides nuls) par dichotomie elles aussi, celles à features
+    infinies en un seul appel, qui les vaut toutes NaN si le backend les rejette.
+
+    Si timings (dict) est fourni, il reçoit le temps et le nombre de lignes du
+    chemin vectorisé (batch_ms, batch_rows) et du chemin d'erreur (error_ms, error_rows).
+    """
+    out = np.full(len(df), np.nan)
+    feats = _derived_features(df)
+    if feats is None:
+        suspect = infinite = np.zeros(len(df), dtype=bool)
+    else:
+        suspect = ~np.isfinite(feats).all(axis=1)
+        infinite = np.isinf(feats).any(axis=1)
+    valid = np.flatnonzero(~suspect)
+    batch_ms, error_ms, batch_rows = 0.0, 0.0, 0
+
+    if valid.size:
+        start = time.perf_counter()
+        try:
+            out[valid] = _finite_or_nan(predict_fn(df.iloc[valid].copy()))
+            batch_ms = (time.perf_counter() - start) * 1000
+            batch_rows = valid.size
+        except Exception:
+            mid = valid.size // 2
+            if valid.size > 1:
+                out[valid] = np.concatenate([_predict_bisect(predict_fn, df.iloc[valid[:mid]]),
+                                             _predict_bisect(predict_fn, df.iloc[valid[mid:]])])
+            error_ms += (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    nan_rows = np.flatnonzero(suspect & ~infinite)
+    if nan_rows.size:
+        out[nan_rows] = _predict_bisect(predict_fn, df.iloc[nan_rows])
+    inf_rows = np.flatnonzero(infinite)
+    if inf_rows.size:
+        try:
+            out[inf_rows] = _finite_or_nan(predict_fn(df.iloc[inf_rows].copy()))
+        except Exception:
+            pass
+    if suspect.any():
+        error_ms += (time.perf_counter() - start) * 1000
+
+    if timings is not None:
+        timings.update(batch_ms=batch_ms, batch_rows=batch_rows,
+                       error_ms=error_ms, error_rows=len(df) - batch_rows)
+    return out
+
+
+def _predict_chunks(predict_fn, df, chunk_size, n_jobs):
+    bounds = range(0, len(df), chunk_size)
+    results = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(predict_rows_safe)(predict_fn, df.iloc[start:start + chunk_size])
+        for start in bounds
+    )
+    return np.concatenate(results) if results else np.array([])
+
+
+# ============================================================
+# ENREGISTREMENT / CHARGEMENT
+
+def record_golden(inputs, predict_fn, path, chunk_size=2048, n_jobs=1, extra_meta=None):
+    """Calcule les prédictions de référence et les stocke en .npz compressé"""
+    preds = _predict_chunks(predict_fn, inputs, chunk_size, n_jobs)
+    save_golden(inputs, preds, path, extra_meta)
+    return preds
+
+
+def save_golden(inputs, preds, path, extra_meta=None):
+    areas = sorted(inputs["Area"].unique().tolist())
+    items = sorted(inputs["Item"].unique().tolist())
+    meta = {"areas": areas, "items": items, "n_rows": int(len(inputs))}
+    meta.update(extra_meta or {})
+
+    np.savez_compressed(
+        path,
+        meta=np.array(json.dumps(meta)),
+        area=pd.Categorical(inputs["Area"], categories=areas).codes.astype(np.int16),
+        item=pd.Categorical(inputs["Item"], categories=items).codes.astype(np.int16),
+        year=inputs["Year"].to_numpy(dtype=np.int16),
+        rain=inputs["average_rain_fall_mm_per_year"].to_numpy(dtype=np.float64),
+        temp=inputs["avg_temp"].to_numpy(dtype=np.float64),
+        pesticides=inputs["pesticides_tonnes"].to_numpy(dtype=np.float64),
+        prediction=np.asarray(preds, dtype=np.float64),
+    )
+
+
+def load_golden(path):
+    """Renvoie (inputs, predictions, meta)"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        inputs = pd.DataFrame({
+            "Area": np.asarray(meta["areas"], dtype=object)[data["area"]],
+            "Item": np.asarray(meta["items"], dtype=object)[data["item"]],
+            "Year": data["year"].astype(int),
+            "average_rain_fall_mm_per_year": data["rain"],
+            "avg_temp": data["temp"],
+            "pesticides_tonnes": data["pesticides"],
+        }, columns=INPUT_COLUMNS)
+        preds = data["prediction"].copy()
+    return inputs, preds, meta
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ============================================================
+# VÉRIFICATION D'UN BACKEND
+
+def check_backend(inputs, reference, predict_fn, rtol=1e-9, atol=1e-6,
+                  chunk_size=2048, n_jobs=-1, top_k=10, name="backend"):
+    """Compare un backend aux prédictions de référence.
+
+    Une ligne est conforme si |pred - ref| <= atol + rtol * |ref|, ou si
+    la référence et le backend échouent tous les deux (NaN).
+    """
+    start = time.perf_counter()
+    preds = _predict_chunks(predict_fn, inputs, chunk_size, n_jobs)
+    elapsed = time.perf_counter() - start
+
+    ref_nan = np.isnan(reference)
+    pred_nan = np.isnan(preds)
+    both = ~ref_nan & ~pred_nan
+
+    abs_diff = np.full(len(reference), np.inf)
+    abs_diff[ref_nan & pred_nan] = 0.0
+    abs_diff[both] = np.abs(preds[both] - reference[both])
+    rel_diff = abs_diff / np.maximum(np.abs(np.nan_to_num(reference)), 1e-12)
+
+    tolerance = atol + rtol * np.abs(np.nan_to_num(reference))
+    failed = abs_diff > tolerance
+
+    order = np.argsort(-abs_diff, kind="stable")[:top_k]
+    worst = inputs.iloc[order].copy()
+    worst["reference"] = reference[order]
+    worst["prediction"] = preds[order]
+    worst["abs_diff"] = abs_diff[order]
+
+    finite = np.isfinite(abs_diff)
+    return {
+        "backend": name,
+        "n_rows": int(len(reference)),
+        "n_failed": int(failed.sum()),
+        "n_error_mismatch": int((ref_nan != pred_nan).sum()),
+        "max_abs_diff": float(abs_diff[finite].max()) if finite.any() else 0.0,
+        "max_rel_diff": float(rel_diff[finite].max()) if finite.any() else 0.0,
+        "rows_per_s": len(reference) / elapsed if elapsed > 0 else float("inf"),
+        "passed": bool(not failed.any()),
+        "worst": worst.to_dict(orient="records"),
+    }
+
+
+def check_backends(inputs, reference, backends, **kwargs):
+    """Vérifie chaque backend {nom: predict_fn} contre la référence"""
+    return {name: check_backend(inputs, reference, fn, name=name, **kwargs)
+            for name, fn in backends.items()}
+
+
+def format_report(report) -> str:
+    status = "OK" if report["passed"] else "ÉCHEC"
+    lines = [
+        f"[{status}] {report['backend']} : {report['n_failed']}/{report['n_rows']} lignes hors tolérance "
+        f"({report['n_error_mismatch']} divergences d'erreur), "
+        f"écart max abs={report['max_abs_diff']:.3g}, rel={report['max_rel_diff']:.3g}, "
+        f"{report['rows_per_s']:.0f} lignes/s",
+    ]
+    if not report["passed"]:
+        for row in report["worst"]:
+            if row["abs_diff"] == 0:
+                break
+            lines.append(
+                f"    {row['Area']} / {row['Item']} / {row['Year']} "
+                f"rain={row['average_rain_fall_mm_per_year']:.1f} temp={row['avg_temp']:.1f} "
+                f"pest={row['pesticides_tonnes']:.3g} : ref={row['reference']:.6g} "
+                f"pred={row['prediction']:.6g} (écart {row['abs_diff']:.3g})"
+            )
+    return "\n".join(lines)
+
+
+# ============================================================
+# LIGNE DE COMMANDE
+#   API_KEY=... python -m src.golden record
+#   API_KEY=... python -m src.golden check --backends batch single
+
+DEFAULT_PATH = "tests/golden/reference_predictions.npz"
+
+
+def _app_backends():
+    import app
+
+    def single(df):
+        return np.array([app.predict_single(df.iloc[[i]].copy()) for i in range(len(df))])
+
+    return app, {"batch": app.predict_batch, "single": single}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jeu de prédictions de référence (golden)")
+    parser.add_argument("command", choices=["record", "check"])
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--samples", type=int, default=8, help="Tirages aléatoires par strate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=["batch", "single"])
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    parser.add_argument("--atol", type=float, default=1e-6)
+    parser.add_argument("--jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    app, backends = _app_backends()
+
+    if args.command == "record":
+        inputs = generate_golden_inputs(app.AREAS, app.ITEMS, args.samples, args.seed)
+        meta = {
+            "seed": args.seed,
+            "samples_per_stratum": args.samples,
+            "model_sha256": file_sha256("model_artifacts/final_model.pkl"),
+        }
+        preds = record_golden(inputs, backends["single"], args.path, n_jobs=args.jobs, extra_meta=meta)
+        print(f"{len(preds)} prédictions de référence enregistrées dans {args.path} "
+              f"({int(np.isnan(preds).sum())} entrées en erreur)")
+        return 0
+
+    inputs, reference, meta = load_golden(args.path)
+    if meta.get("model_sha256") not in (None, file_sha256("model_artifacts/final_model.pkl")):
+        print("Attention : le modèle a changé depuis l'enregistrement de la référence")
+
+    reports = check_backends(
+        inputs, reference, {name: backends[name] for name in args.backends},
+        rtol=args.rtol, atol=args.atol, n_jobs=args.jobs,
+    )
+    for report in reports.values():
+        print(format_report(report))
+    return 0 if all(r["passed"] for r in reports.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,233 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog
+
+from src.feature_engineering import INPUT_COLUMNS
+
+
+# ============================================================
+# CACHE DES PRÉDICTIONS
+
+class PredictionCache:
+    """Cache LRU des prédictions, indexé par la ligne d'entrée complète (thread-safe)"""
+
+    def __init__(self, maxsize=200_000):
+        self.maxsize = maxsize
+        self._store = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._store)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def predict(self, df, predict_fn):
+        """Prédit df en n'évaluant le modèle que sur les lignes absentes du cache.
+
+        Les lignes manquantes (dédoublonnées) sont envoyées en un seul batch
+        à predict_fn, qui doit renvoyer un tableau de rendements (hg/ha).
+        Renvoie (prédictions, nombre de lignes servies par le cache pour cet appel).
+        """
+        keys = list(df[INPUT_COLUMNS].itertuples(index=False, name=None))
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._store:
+                    self._store.move_to_end(key)
+                    found[key] = self._store[key]
+                else:
+                    found[key] = None
+                    missing.append(key)
+            n_hits = len(keys) - len(missing)
+            self.misses += len(missing)
+            self.hits += n_hits
+
+        if missing:
+            # le modèle est évalué hors verrou
+            df_missing = pd.DataFrame(missing, columns=INPUT_COLUMNS)
+            preds = np.asarray(predict_fn(df_missing), dtype=float)
+            computed = dict(zip(missing, preds))
+            found.update(computed)
+            with self._lock:
+                self._store.update(computed)
+                while len(self._store) > self.maxsize:
+                    self._store.popitem(last=False)
+
+        return np.array([found[k] for k in keys], dtype=float), n_hits
+
+
+# ============================================================
+# ÉVALUATION DE LA GRILLE SCÉNARIO x CULTURE x PESTICIDES
+
+def build_grid(area, year, scenarios, items, pesticide_levels) -> pd.DataFrame:
+    """Construit la grille complète (S x C x P) dans l'ordre des colonnes du modèle"""
+    rains = np.array([s["average_rain_fall_mm_per_year"] for s in scenarios], dtype=float)
+    temps = np.array([s["avg_temp"] for s in scenarios], dtype=float)
+    levels = np.asarray(pesticide_levels, dtype=float)
+
+    n_s, n_c, n_p = len(scenarios), len(items), len(levels)
+    size = n_s * n_c * n_p
+
+    return pd.DataFrame({
+        "Area": np.full(size, area, dtype=object),
+        "Item": np.tile(np.repeat(np.asarray(items, dtype=object), n_p), n_s),
+        "Year": np.full(size, int(year)),
+        "average_rain_fall_mm_per_year": np.repeat(rains, n_c * n_p),
+        "avg_temp": np.repeat(temps, n_c * n_p),
+        "pesticides_tonnes": np.tile(levels, n_s * n_c),
+    }, columns=INPUT_COLUMNS)
+
+
+def evaluate_grid(area, year, scenarios, items, pesticide_levels, predict_fn, cache=None):
+    """Renvoie le tenseur des rendements Y[s, c, p] (hg/ha) et le nombre de lignes servies par le cache"""
+    grid = build_grid(area, year, scenarios, items, pesticide_levels)
+    if cache is not None:
+        preds, n_hits = cache.predict(grid, predict_fn)
+    else:
+        preds, n_hits = np.asarray(predict_fn(grid), dtype=float), 0
+    return preds.reshape(len(scenarios), len(items), len(pesticide_levels)), n_hits
+
+
+# ============================================================
+# RÉSOLUTION DU PROGRAMME LINÉAIRE
+
+def solve_allocation(yields, pesticide_levels, pesticide_budget, min_shares, risk_aversion=0.5):
+    """Alloue les parts de surface x[c, p] en maximisant un compromis rendement/risque.
+
+    Objectif : (1 - λ) * rendement moyen sur les scénarios + λ * rendement du pire scénario
+    Contraintes :
+        - somme des parts = 1
+        - somme x[c, p] * niveau_p <= budget de pesticides
+        - somme_p x[c, p] >= part minimale de la culture c
+    """
+    n_s, n_c, n_p = yields.shape
+    n_x = n_c * n_p
+    levels = np.asarray(pesticide_levels, dtype=float)
+    min_shares = np.asarray(min_shares, dtype=float)
+
+    if min_shares.sum() > 1 + 1e-9:
+        raise ValueError("La somme des parts minimales dépasse 100 %")
+    if levels.min() > pesticide_budget:
+        raise ValueError("Budget de pesticides inférieur au plus petit niveau proposé")
+
+    Y = yields.reshape(n_s, n_x)
+
+    # variables : x (n_x) puis t (rendement du pire scénario)
+    c = np.zeros(n_x + 1)
+    c[:n_x] = -(1 - risk_aversion) * Y.mean(axis=0)
+    c[n_x] = -risk_aversion
+
+    # t - Y[s] . x <= 0 pour chaque scénario
+    A_risk = np.hstack([-Y, np.ones((n_s, 1))])
+    # budget de pesticides
+    A_budget = np.append(np.tile(levels, n_c), 0.0)[None, :]
+    # parts minimales : -somme_p x[c, p] <= -min_c
+    A_min = np.zeros((n_c, n_x + 1))
+    for ci in range(n_c):
+        A_min[ci, ci * n_p:(ci + 1) * n_p] = -1.0
+
+    A_ub = np.vstack([A_risk, A_budget, A_min])
+    b_ub = np.concatenate([np.zeros(n_s), [pesticide_budget], -min_shares])
+
+    A_eq = np.append(np.ones(n_x), 0.0)[None, :]
+    b_eq = np.array([1.0])
+
+    bounds = [(0, None)] * n_x + [(None, None)]
+
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method="highs")
+    if res.status != 0:
+        raise ValueError(f"Aucune allocation réalisable : {res.message}")
+
+    x = np.clip(res.x[:n_x], 0, None).reshape(n_c, n_p)
+    marginals = res.ineqlin.marginals
+
+    return {
+        "shares": x,
+        "objective": float(-res.fun),
+        # d(objectif)/d(budget), en hg/ha par tonne
+        "budget_shadow_price": float(-marginals[n_s]),
+        # d(objectif)/d(part minimale) : coût d'une part imposée supplémentaire
+        "min_share_shadow_prices": marginals[n_s + 1:].astype(float),
+    }
+
+
+# ============================================================
+# POINT D'ENTRÉE
+
+def optimize_portfolio(
+    area,
+    year,
+    scenarios,
+    items,
+    pesticide_levels,
+    pesticide_budget,
+    min_shares,
+    predict_fn,
+    risk_aversion=0.5,
+    total_area_ha=1.0,
+    cache=None,
+):
+    """Évalue la grille puis résout l'allocation, avec analyse de sensibilité"""
+    start = time.perf_counter()
+
+    yields, n_hits = evaluate_grid(area, year, scenarios, items, pesticide_levels, predict_fn, cache)
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    solution = solve_allocation(yields, pesticide_levels, pesticide_budget, min_shares, risk_aversion)
+    shares = solution["shares"]
+
+    # rendement du plan dans chaque scénario
+    plan_yields = np.einsum("scp,cp->s", yields, shares)
+    pesticide_used = float((shares * np.asarray(pesticide_levels, dtype=float)).sum())
+
+    plan = []
+    for ci, item in enumerate(items):
+        for pi, level in enumerate(pesticide_levels):
+            share = float(shares[ci, pi])
+            if share > 1e-9:
+                plan.append({
+                    "Item": item,
+                    "pesticides_tonnes": float(level),
+                    "share": share,
+                    "area_ha": share * total_area_ha,
+                    "expected_yield_hg_ha": float(yields[:, ci, pi].mean()),
+                })
+    plan.sort(key=lambda p: p["share"], reverse=True)
+
+    return {
+        "plan": plan,
+        "objective_hg_ha": solution["objective"],
+        "expected_yield_hg_ha": float(plan_yields.mean()),
+        "expected_production_hg": float(plan_yields.mean() * total_area_ha),
+        "pesticide_used": pesticide_used,
+        "sensitivity": {
+            "budget_shadow_price": solution["budget_shadow_price"],
+            "min_share_shadow_prices": dict(zip(items, solution["min_share_shadow_prices"].tolist())),
+            "scenario_yields": {
+                "mean": float(plan_yields.mean()),
+                "std": float(plan_yields.std()),
+                "worst": float(plan_yields.min()),
+                "best": float(plan_yields.max()),
+                "worst_scenario": int(plan_yields.argmin()),
+            },
+        },
+        "stats": {
+            "n_evaluations": int(yields.size),
+            "cache_hits": n_hits,
+            "predict_ms": predict_ms,
+            "total_ms": (time.perf_counter() - start) * 1000,
+        },
+    }
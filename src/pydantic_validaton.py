@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, validator
+from typing import Dict, List, Optional
 import json
 import os
 import functools
@@ -48,4 +49,60 @@ class RecommendInput(BaseModel):
     # si par erreur on passe des espaces avant et après
     @validator("Area")
     def strip_strings(cls, v):
-        return v.strip()
\ No newline at end of file
+        return v.strip()
+
+class Scenario(BaseModel):
+    average_rain_fall_mm_per_year: float = Field(..., ge=0, description="Pluviométrie annuelle moyenne en mm")
+    avg_temp: float = Field(..., description="Température moyenne annuelle en °C")
+
+
+class OptimizeInput(BaseModel):
+    Area: str = Field(..., description="Le pays de production")
+    Year: int = Field(..., ge=1900, le=2050, description="Année de production")
+    scenarios: List[Scenario] = Field(..., min_length=1, max_length=1000, description="Scénarios climatiques (pluie, température)")
+    pesticide_levels: List[float] = Field(..., min_length=1, max_length=50, description="Niveaux de pesticides candidats en tonnes")
+    pesticide_budget: float = Field(..., ge=0, description="Budget de pesticides en tonnes (somme part x niveau)")
+    items: Optional[List[str]] = Field(None, description="Cultures candidates (toutes par défaut)")
+    min_share: float = Field(0.0, ge=0, le=1, description="Part minimale de surface par culture")
+    min_share_by_item: Dict[str, float] = Field(default_factory=dict, description="Parts minimales spécifiques à certaines cultures")
+    risk_aversion: float = Field(0.5, ge=0, le=1, description="0 = rendement moyen, 1 = pire scénario")
+    total_area_ha: float = Field(1.0, gt=0, description="Surface totale à allouer en hectares")
+
+    # si par erreur on passe des espaces avant et après
+    @validator("Area")
+    def strip_strings(cls, v):
+        return v.strip()
+
+    @validator("pesticide_levels", each_item=True)
+    def validate_levels(cls, v):
+        if v < 0:
+            raise ValueError("Les niveaux de pesticides doivent être positifs")
+        return v
+
+    @validator("items")
+    def validate_items(cls, v):
+        if v is None:
+            return v
+        v = [item.strip() for item in v]
+        allowed = get_allowed_items()
+        unknown = [item for item in v if allowed and item not in allowed]
+        if unknown:
+            raise ValueError(f"Items inconnus : {unknown}")
+        # une culture en double dupliquerait ses colonnes dans le programme linéaire
+        duplicates = sorted({item for item in v if v.count(item) > 1})
+        if duplicates:
+            raise ValueError(f"Items en double : {duplicates}")
+        return v
+
+    # chaque culture contrainte doit exister et faire partie des cultures candidates
+    @validator("min_share_by_item")
+    def validate_min_share_by_item(cls, v, values):
+        selected = values.get("items")
+        allowed = selected if selected is not None else get_allowed_items()
+        unknown = [item for item in v if allowed and item not in allowed]
+        if unknown:
+            raise ValueError(f"Parts minimales pour des cultures hors sélection : {unknown}")
+        for item, share in v.items():
+            if not 0 <= share <= 1:
+                raise ValueError(f"Part minimale invalide pour {item} : {share}")
+        return v
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import INPUT_COLUMNS, prepare_features
+from src.golden import predict_rows_safe
+
+
+# ============================================================
+# FORMAT DE CAPTURE
+# Le trafic est capturé dans le journal d'audit NDJSON de l'API
+# (AUDIT_LOG_PATH, voir src/request_logging.py), une ligne par requête :
+#   {"ts": ..., "endpoint": "predict", "input": {...InputData}, "output": 1234.5, "latency_ms": 3.1}
+#   {"ts": ..., "endpoint": "recommend", "input": {...RecommendInput}, "output": {"Maize": ..., ...}, "latency_ms": 40.2}
+# Une requête /recommend est dépliée en une ligne par culture.
+
+REPLAYED_ENDPOINTS = ("predict", "recommend")
+
+
+def iter_capture_rows(path, items=None):
+    """Parcourt la capture et produit une ligne d'entrée modèle par prédiction"""
+    with open(path, "r", encoding="utf-8") as f:
+        for request_id, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            endpoint = record.get("endpoint")
+            if endpoint not in REPLAYED_ENDPOINTS:
+                continue
+
+            inputs = record["input"]
+            output = record.get("output")
+            latency_ms = record.get("latency_ms")
+
+            if endpoint == "predict":
+                yield _capture_row(request_id, endpoint, inputs, inputs["Item"], output, latency_ms)
+            else:
+                recorded = output if isinstance(output, dict) else {}
+                for item in (recorded.keys() or items or []):
+                    yield _capture_row(request_id, endpoint, inputs, item, recorded.get(item), latency_ms)
+
+
+def _capture_row(request_id, endpoint, inputs, item, recorded, latency_ms):
+    row = {col: inputs.get(col) for col in INPUT_COLUMNS}
+    row["Item"] = item
+    row["request_id"] = request_id
+    row["endpoint"] = endpoint
+    row["recorded"] = np.nan if recorded is None else float(recorded)
+    row["recorded_latency_ms"] = np.nan if latency_ms is None else float(latency_ms)
+    return row
+
+
+def iter_capture_chunks(path, batch_size=1024, items=None):
+    """Découpe la capture en DataFrames d'au plus batch_size lignes"""
+    rows = []
+    for row in iter_capture_rows(path, items):
+        rows.append(row)
+        if len(rows) >= batch_size:
+            yield pd.DataFrame(rows)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows)
+
+
+def load_capture_index(path, items=None) -> pd.DataFrame:
+    """Colonnes légères de la capture (Area, Item, requête, sortie et latence enregistrées).
+
+    Construites une seule fois pour tous les modèles ; les entrées complètes
+    ne sont lues qu'en flux par replay_model.
+    """
+    columns = {"Area": [], "Item": [], "request_id": [], "recorded": [], "recorded_latency_ms": []}
+    for row in iter_capture_rows(path, items):
+        for col, values in columns.items():
+            values.append(row[col])
+    return pd.DataFrame({
+        "Area": pd.Categorical(columns["Area"]),
+        "Item": pd.Categorical(columns["Item"]),
+        "request_id": np.asarray(columns["request_id"], dtype=np.int64),
+        "recorded": np.asarray(columns["recorded"], dtype=float),
+        "recorded_latency_ms": np.asarray(columns["recorded_latency_ms"], dtype=float),
+    })
+
+
+# ============================================================
+# JEUX D'ARTEFACTS
+
+class ArtifactSet:
+    """Modèle + mapping pays -> cluster chargés depuis un dossier d'artefacts"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.model = joblib.load(os.path.join(directory, "final_model.pkl"))
+        self.country_to_cluster = joblib.load(os.path.join(directory, "country_to_cluster.pkl"))
+
+    def predict(self, df):
+        df_prepared = prepare_features(df[INPUT_COLUMNS].copy(), self.country_to_cluster)
+        return np.expm1(self.model.predict(df_prepared))
+
+
+# artefacts chargés une seule fois par process du pool
+_WORKER_ARTIFACTS = None
+
+
+def _init_worker(directory):
+    global _WORKER_ARTIFACTS
+    _WORKER_ARTIFACTS = ArtifactSet(directory)
+
+
+def _score_chunk(df, artifacts=None):
+    """Prédit un lot ; renvoie (prédictions, temps du chemin vectorisé et du chemin d'erreur)"""
+    artifacts = artifacts or _WORKER_ARTIFACTS
+    timings = {}
+    preds = predict_rows_safe(artifacts.predict, df[INPUT_COLUMNS], timings)
+    return preds, timings
+
+
+# ============================================================
+# REJEU
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {}
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def replay_model(path, directory, batch_size=1024, n_workers=None, items=None, max_pending=None):
+    """Rejoue la capture sur un jeu d'artefacts.
+
+    Les lots sont distribués sur un pool de processus (n_workers=0 : dans le
+    process courant). Au plus max_pending lots sont en vol pour que la capture
+    soit lue en flux : seules les prédictions et les mesures sont conservées.
+    Renvoie (prédictions, mesures de chaque lot, durée totale en s).
+    """
+    preds, timings = [], []
+
+    if n_workers == 0:
+        artifacts = ArtifactSet(directory)
+        start = time.perf_counter()
+        for chunk in iter_capture_chunks(path, batch_size, items):
+            p, t = _score_chunk(chunk, artifacts)
+            preds.append(p)
+            timings.append(t)
+        wall_s = time.perf_counter() - start
+    else:
+        n_workers = n_workers or os.cpu_count() or 1
+        max_pending = max_pending or 2 * n_workers
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(directory,)) as pool:
+            # chauffe : chaque worker charge ses artefacts avant la mesure
+            list(pool.map(_noop, range(n_workers)))
+            start = time.perf_counter()
+            pending = []
+            for chunk in iter_capture_chunks(path, batch_size, items):
+                pending.append(pool.submit(_score_chunk, chunk))
+                if len(pending) >= max_pending:
+                    p, t = pending.pop(0).result()
+                    preds.append(p)
+                    timings.append(t)
+            for future in pending:
+                p, t = future.result()
+                preds.append(p)
+                timings.append(t)
+            wall_s = time.perf_counter() - start
+
+    preds = np.concatenate(preds) if preds else np.array([])
+    return preds, timings, wall_s
+
+
+def _noop(_):
+    return None
+
+
+def _model_stats(directory, preds, timings, wall_s):
+    """Débit et latences du chemin vectorisé, temps du chemin d'erreur compté à part"""
+    batch_ms = np.array([t["batch_ms"] for t in timings if t["batch_rows"]])
+    batch_rows = np.array([t["batch_rows"] for t in timings if t["batch_rows"]])
+    error_ms = sum(t["error_ms"] for t in timings)
+    n_rows = len(preds)
+    return {
+        "directory": directory,
+        "n_rows": n_rows,
+        "n_errors": int(np.isnan(preds).sum()),
+        "wall_s": wall_s,
+        "wall_rows_per_s": n_rows / wall_s if wall_s > 0 else float("inf"),
+        # débit d'un worker sur les lots prédits en un seul appel
+        "rows_per_s": batch_rows.sum() * 1000 / batch_ms.sum() if batch_ms.sum() > 0 else float("inf"),
+        "batch_latency_ms": _percentiles(batch_ms),
+        "row_latency_us": _percentiles(batch_ms * 1000 / batch_rows) if batch_rows.size else {},
+        "error_path": {
+            "rows": int(sum(t["error_rows"] for t in timings)),
+            "ms": float(error_ms),
+            "batches": int(sum(1 for t in timings if t["error_rows"])),
+        },
+    }
+
+
+def prediction_deltas(rows, reference, candidate):
+    """Écarts candidate - reference agrégés par (Area, Item)"""
+    df = rows[["Area", "Item"]].copy()
+    df["delta"] = candidate - reference
+    df["abs_delta"] = df["delta"].abs()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["rel_delta"] = np.where(reference != 0, df["delta"] / np.abs(reference), np.nan)
+
+    grouped = df.groupby(["Area", "Item"], sort=True, observed=True)
+    return pd.DataFrame({
+        "n": grouped.size(),
+        "mean_delta": grouped["delta"].mean(),
+        "mean_abs_delta": grouped["abs_delta"].mean(),
+        "max_abs_delta": grouped["abs_delta"].max(),
+        "mean_rel_delta": grouped["rel_delta"].mean(),
+    }).sort_values("mean_abs_delta", ascending=False)
+
+
+def replay(path, models, batch_size=1024, n_workers=None, items=None):
+    """Rejoue la capture sur chaque jeu d'artefacts {nom: dossier}.
+
+    Le premier modèle sert de référence pour les écarts de prédiction ;
+    chaque modèle est aussi comparé aux prédictions enregistrées en production.
+    """
+    rows = load_capture_index(path, items)
+    if rows.empty:
+        raise ValueError(f"Aucune requête rejouable dans {path}")
+
+    names = list(models)
+    report = {"models": {}, "deltas": {}, "deltas_vs_recorded": {}}
+    recorded = rows["recorded"].to_numpy(dtype=float)
+    all_preds = {}
+
+    for name in names:
+        preds, timings, wall_s = replay_model(path, models[name], batch_size, n_workers, items)
+        all_preds[name] = preds
+        report["models"][name] = _model_stats(models[name], preds, timings, wall_s)
+        if not np.isnan(recorded).all():
+            report["deltas_vs_recorded"][name] = prediction_deltas(rows, recorded, preds)
+
+    report["n_requests"] = int(rows["request_id"].nunique())
+    report["n_rows"] = int(len(rows))
+    report["recorded_latency_ms"] = _percentiles(
+        rows.drop_duplicates("request_id")["recorded_latency_ms"].to_numpy(dtype=float)
+    )
+
+    baseline = names[0]
+    for name in names[1:]:
+        report["deltas"][f"{name} vs {baseline}"] = prediction_deltas(rows, all_preds[baseline], all_preds[name])
+
+    return report
+
+
+def format_report(report, top=10) -> str:
+    lines = [f"{report['n_requests']} requêtes rejouées ({report['n_rows']} prédictions)"]
+    if report["recorded_latency_ms"]:
+        lat = report["recorded_latency_ms"]
+        lines.append(f"  latence production : p50={lat['p50']:.1f} ms p99={lat['p99']:.1f} ms")
+
+    for name, stats in report["models"].items():
+        lat = stats["batch_latency_ms"]
+        err = stats["error_path"]
+        lines.append(
+            f"  [{name}] {stats['rows_per_s']:.0f} lignes/s par worker (vectorisé), "
+            f"{stats['wall_rows_per_s']:.0f} lignes/s au total, erreurs={stats['n_errors']}, "
+            f"lot p50={lat.get('p50', 0):.1f} ms p95={lat.get('p95', 0):.1f} ms p99={lat.get('p99', 0):.1f} ms"
+        )
+        if err["rows"]:
+            lines.append(f"      chemin d'erreur : {err['rows']} lignes sur {err['batches']} lots, {err['ms']:.1f} ms")
+
+    for title, section in (("Écarts entre modèles", "deltas"), ("Écarts vs production", "deltas_vs_recorded")):
+        for name, deltas in report[section].items():
+            lines.append(f"\n{title} — {name} (top {top} Area/Item) :")
+            lines.append(deltas.head(top).to_string(float_format=lambda v: f"{v:.4g}"))
+    return "\n".join(lines)
+
+
+# ============================================================
+# LIGNE DE COMMANDE
+#   python -m src.replay logs/audit.ndjson --models actuel=model_artifacts candidat=artifacts_v2
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rejeu du trafic capturé sur plusieurs modèles")
+    parser.add_argument("capture", help="Journal d'audit NDJSON (AUDIT_LOG_PATH)")
+    parser.add_argument("--models", nargs="+", required=True,
+                        help="Dossiers d'artefacts, éventuellement nommés : nom=dossier")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=None, help="0 = sans pool de processus")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    models = {}
+    for spec in args.models:
+        name, _, directory = spec.rpartition("=")
+        models[name or os.path.basename(os.path.normpath(directory))] = directory
+
+    report = replay(args.capture, models, args.batch_size, args.workers)
+    print(format_report(report, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
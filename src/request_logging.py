@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+
+
+# ============================================================
+# CONFIGURATION PAR VARIABLES D'ENVIRONNEMENT
+#   LOG_LEVELS="predict=WARNING,recommend=INFO"   niveau minimal par endpoint
+#   LOG_SAMPLE_RATES="recommend=0.1"              fraction des logs < WARNING conservés
+#   AUDIT_LOG_PATH="logs/audit.ndjson"            active le journal d'audit (NDJSON)
+#   AUDIT_SAMPLE_RATE="1.0"                       fraction des requêtes auditées
+
+def _parse_mapping(value, cast):
+    """Transforme "a=1,b=2" en {"a": cast("1"), "b": cast("2")}"""
+    mapping = {}
+    for part in (value or "").split(","):
+        if "=" not in part:
+            continue
+        key, raw = part.split("=", 1)
+        mapping[key.strip()] = cast(raw.strip())
+    return mapping
+
+
+def _parse_level(value):
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Niveau de log inconnu : {value}")
+    return level
+
+
+_STOP = object()
+
+
+# ============================================================
+# LOGGER ASYNCHRONE
+
+class AsyncRequestLogger:
+    """Journalisation structurée déportée dans un thread d'écriture.
+
+    Les threads de requête se contentent de filtrer (niveau, échantillonnage)
+    puis de déposer un tuple dans une file ; le formatage, l'écriture des logs
+    et celle du journal d'audit sont faits par lots dans le thread d'écriture.
+    Si la file est pleine, l'enregistrement est abandonné plutôt que de bloquer ;
+    le thread d'écriture signale les abandons au plus toutes les drop_report_interval s.
+    """
+
+    def __init__(self, logger, levels=None, sample_rates=None, default_level=logging.INFO,
+                 audit_path=None, audit_sample_rate=1.0, batch_size=256, max_queue=10_000,
+                 drop_report_interval=10.0):
+        self.logger = logger
+        self.levels = levels or {}
+        self.sample_rates = sample_rates or {}
+        self.default_level = default_level
+        self.audit_path = audit_path
+        self.audit_sample_rate = audit_sample_rate
+        self.batch_size = batch_size
+        self.drop_report_interval = drop_report_interval
+
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._reported_drops = 0
+        self._last_drop_report = time.monotonic()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._audit_file = None
+        if audit_path:
+            os.makedirs(os.path.dirname(audit_path) or ".", exist_ok=True)
+            self._audit_file = open(audit_path, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name="request-logger", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, logger):
+        return cls(
+            logger,
+            levels=_parse_mapping(os.getenv("LOG_LEVELS"), _parse_level),
+            sample_rates=_parse_mapping(os.getenv("LOG_SAMPLE_RATES"), float),
+            audit_path=os.getenv("AUDIT_LOG_PATH") or None,
+            audit_sample_rate=float(os.getenv("AUDIT_SAMPLE_RATE", "1.0")),
+        )
+
+    # --------------------------------------------------------
+    # API côté requête : filtrage puis simple mise en file
+
+    def is_enabled(self, endpoint, level):
+        if level < self.levels.get(endpoint, self.default_level):
+            return False
+        if level < logging.WARNING:
+            rate = self.sample_rates.get(endpoint, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        return self.logger.isEnabledFor(level)
+
+    def log(self, endpoint, level, event, **fields):
+        if self.is_enabled(endpoint, level):
+            self._put(("log", time.time(), endpoint, level, event, fields))
+
+    def info(self, endpoint, event, **fields):
+        self.log(endpoint, logging.INFO, event, **fields)
+
+    def warning(self, endpoint, event, **fields):
+        self.log(endpoint, logging.WARNING, event, **fields)
+
+    def audit(self, endpoint, inputs, outputs, latency_ms=None):
+        """Enregistre une requête rejouable (entrées + prédictions) dans le journal d'audit"""
+        if self._audit_file is None:
+            return
+        if self.audit_sample_rate < 1.0 and random.random() >= self.audit_sample_rate:
+            return
+        self._put(("audit", time.time(), endpoint, inputs, outputs, latency_ms))
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def _drop(self):
+        with self._dropped_lock:
+            self._dropped += 1
+
+    def _put(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._drop()
+
+    # --------------------------------------------------------
+    # Thread d'écriture
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.drop_report_interval or None)]
+            except queue.Empty:
+                self._report_drops()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            audit_lines = []
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                elif record[0] == "log":
+                    self._write_log(record)
+                else:
+                    audit_lines.append(self._format_audit(record))
+
+            if audit_lines:
+                try:
+                    self._audit_file.write("".join(audit_lines))
+                    self._audit_file.flush()
+                except Exception as e:
+                    self.logger.error(f"Écriture du journal d'audit impossible : {e}")
+
+            self._report_drops(force=stop)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _report_drops(self, force=False):
+        """Signale (depuis le thread d'écriture) les enregistrements abandonnés depuis le dernier rapport"""
+        now = time.monotonic()
+        total = self._dropped
+        if total <= self._reported_drops:
+            return
+        if not force and now - self._last_drop_report < self.drop_report_interval:
+            return
+        self.logger.warning(f"{total - self._reported_drops} enregistrements de log abandonnés "
+                            f"(file pleine), {total} au total")
+        self._reported_drops = total
+        self._last_drop_report = now
+
+    def _write_log(self, record):
+        _, ts, endpoint, level, event, fields = record
+        try:
+            payload = json.dumps(fields, ensure_ascii=False, default=str) if fields else ""
+            log_record = self.logger.makeRecord(self.logger.name, level, "(request_logging)", 0,
+                                                f"{endpoint} | {event} {payload}".rstrip(), None, None,
+                                                extra={"request_ts": ts})
+            # horodatage de la requête, pas de l'écriture différée : asctime et l'ordre restent justes
+            log_record.created = ts
+            log_record.msecs = (ts - int(ts)) * 1000
+            self.logger.handle(log_record)
+        except Exception:
+            self._drop()
+
+    @staticmethod
+    def _format_audit(record):
+        _, ts, endpoint, inputs, outputs, latency_ms = record
+        line = {"ts": ts, "endpoint": endpoint, "input": inputs, "output": outputs}
+        if latency_ms is not None:
+            line["latency_ms"] = latency_ms
+        return json.dumps(line, ensure_ascii=False, default=float) + "\n"
+
+    # --------------------------------------------------------
+    # Cycle de vie
+
+    def flush(self):
+        """Attend que tous les enregistrements en file soient écrits"""
+        self._queue.join()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+        if self._audit_file is not None:
+            self._audit_file.close()
+            self._audit_file = None
+
+
+def create_request_logger(logger):
+    """Crée le logger asynchrone configuré par l'environnement, fermé à l'arrêt du process"""
+    request_logger = AsyncRequestLogger.from_env(logger)
+    atexit.register(request_logger.close)
+    return request_logger
@@ -0,0 +1,156 @@
+import json
+import time
+import threading
+import pytest
+from src.admission import (
+    INTERACTIVE, BULK, TokenBucket, ApiClient, KeyRegistry, PriorityScheduler,
+    RateLimited, Overloaded
+)
+
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=100, capacity=10)
+    assert bucket.try_acquire(10) == 0
+    wait = bucket.try_acquire(5)
+    assert wait > 0
+    time.sleep(wait + 0.01)
+    assert bucket.try_acquire(5) == 0
+
+
+def test_token_bucket_debt_beyond_capacity():
+    """Une requête plus coûteuse que la rafale passe seau plein, puis la clé attend cost / rate"""
+    bucket = TokenBucket(rate=50, capacity=200)
+    assert bucket.try_acquire(500_000) == 0
+    wait = bucket.try_acquire(1)
+    assert wait == pytest.approx((500_000 - 200 + 1) / 50, rel=1e-3)
+    # une autre grosse requête doit aussi attendre le remboursement de la dette
+    assert bucket.try_acquire(500_000) > wait
+
+
+def test_token_bucket_refund():
+    bucket = TokenBucket(rate=1, capacity=10)
+    assert bucket.try_acquire(10) == 0
+    bucket.refund(10)
+    assert bucket.try_acquire(10) == 0
+    # le remboursement ne dépasse pas la capacité
+    bucket.refund(100)
+    assert bucket.tokens == pytest.approx(10, abs=0.1)
+
+
+def test_client_admit_and_lane():
+    client = ApiClient("bulk", rate=1, burst=3, lane=BULK)
+    client.admit(3)
+    with pytest.raises(RateLimited) as exc:
+        client.admit(1)
+    assert exc.value.retry_after > 0
+    assert client.lane_for(INTERACTIVE) == BULK
+    client.refund(3)
+    client.admit(3)
+
+    unlimited = ApiClient("ui")
+    for _ in range(1000):
+        unlimited.admit(10)
+    assert unlimited.lane_for(INTERACTIVE) == INTERACTIVE
+
+
+def test_registry_from_env(monkeypatch):
+    monkeypatch.setenv("API_KEY", "cle-ui")
+    monkeypatch.setenv("API_KEYS", json.dumps({"cle-bulk": {"name": "bulk", "rate": 5, "burst": 20, "lane": "bulk"}}))
+    registry = KeyRegistry.from_env()
+
+    assert registry.get("cle-ui").name == "default"
+    # la clé historique du frontend reste sans limite tant que RATE_LIMIT n'est pas défini
+    assert registry.get("cle-ui").bucket is None
+    assert registry.get("cle-bulk").lane == BULK
+    assert registry.get("cle-bulk").bucket.capacity == 20
+    assert registry.get("inconnue") is None
+    assert registry.get(None) is None
+
+
+def test_registry_legacy_key_limited_explicitly(monkeypatch):
+    monkeypatch.setenv("API_KEY", "cle-ui")
+    monkeypatch.setenv("RATE_LIMIT", "10")
+    monkeypatch.delenv("API_KEYS", raising=False)
+    client = KeyRegistry.from_env().get("cle-ui")
+    assert client.bucket.rate == 10
+    assert client.bucket.capacity == 200
+
+
+def test_registry_invalid_lane(monkeypatch):
+    monkeypatch.setenv("API_KEYS", json.dumps({"k": {"lane": "vip"}}))
+    with pytest.raises(ValueError):
+        KeyRegistry.from_env()
+
+
+def test_scheduler_interactive_before_bulk():
+    """Les requêtes interactives en file passent devant le travail de masse"""
+    scheduler = PriorityScheduler(workers=1)
+    gate = threading.Event()
+    order = []
+
+    blocker = scheduler.submit(BULK, gate.wait)
+    futures = [scheduler.submit(BULK, order.append, "bulk-1"),
+               scheduler.submit(BULK, order.append, "bulk-2"),
+               scheduler.submit(INTERACTIVE, order.append, "inter-1"),
+               scheduler.submit(INTERACTIVE, order.append, "inter-2")]
+    gate.set()
+    for f in [blocker] + futures:
+        f.result(timeout=5)
+
+    assert order == ["inter-1", "inter-2", "bulk-1", "bulk-2"]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_scheduler_reserves_interactive_worker(workers):
+    """Les tâches de masse ne peuvent pas occuper tous les workers"""
+    scheduler = PriorityScheduler(workers=workers)
+    gate = threading.Event()
+    running = []
+
+    def bulk_job():
+        running.append(1)
+        gate.wait()
+
+    bulk = [scheduler.submit(BULK, bulk_job) for _ in range(workers + 2)]
+    started = time.monotonic()
+    while len(running) < scheduler.bulk_slots and time.monotonic() - started < 5:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    assert len(running) == scheduler.bulk_slots == max(1, workers - 1)
+
+    # une prédiction interactive passe alors que la voie de masse est saturée
+    assert scheduler.submit(INTERACTIVE, lambda: "inter").result(timeout=5) == "inter"
+
+    gate.set()
+    for f in bulk:
+        f.result(timeout=5)
+    assert scheduler.running_bulk == 0
+
+
+def test_scheduler_sheds_when_lane_full():
+    scheduler = PriorityScheduler(workers=1, max_queued={INTERACTIVE: 4, BULK: 1})
+    gate = threading.Event()
+    blocker = scheduler.submit(BULK, gate.wait)
+    blocker_started = time.monotonic()
+    while scheduler.queued[BULK] and time.monotonic() - blocker_started < 5:
+        time.sleep(0.001)
+
+    queued = scheduler.submit(BULK, lambda: "ok")
+    with pytest.raises(Overloaded):
+        scheduler.submit(BULK, lambda: "rejeté")
+    # la voie interactive n'est pas affectée
+    interactive = scheduler.submit(INTERACTIVE, lambda: "inter")
+
+    gate.set()
+    assert queued.result(timeout=5) == "ok"
+    assert interactive.result(timeout=5) == "inter"
+
+
+def test_scheduler_propagates_exceptions():
+    scheduler = PriorityScheduler(workers=1)
+
+    def boom():
+        raise ValueError("Pays inconnu")
+
+    with pytest.raises(ValueError):
+        scheduler.submit(INTERACTIVE, boom).result(timeout=5)
@@ -90,3 +90,141 @@ def test_recommend(client):
     # Vérifie que chaque prédiction est un float
     for value in data["recommendations"].values():
         assert isinstance(value, float)
+
+
+def test_optimize(client):
+    payload = {
+        "Area": "France",
+        "Year": 2021,
+        "scenarios": [
+            {"average_rain_fall_mm_per_year": 600.0, "avg_temp": 12.0},
+            {"average_rain_fall_mm_per_year": 1000.0, "avg_temp": 20.0},
+        ],
+        "pesticide_levels": [0.0, 50.0, 100.0],
+        "pesticide_budget": 60.0,
+        "min_share": 0.05,
+        "risk_aversion": 0.5,
+        "total_area_ha": 100.0
+    }
+
+    headers = {"x-api-key": "test_key_123"}
+
+    response = client.post("/optimize", json=payload, headers=headers)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert "plan" in data
+    assert "sensitivity" in data
+    assert sum(p["area_ha"] for p in data["plan"]) == pytest.approx(100.0)
+
+
+def test_optimize_infeasible(client):
+    payload = {
+        "Area": "France",
+        "Year": 2021,
+        "scenarios": [{"average_rain_fall_mm_per_year": 1000.0, "avg_temp": 20.0}],
+        "pesticide_levels": [50.0],
+        "pesticide_budget": 10.0
+    }
+    headers = {"x-api-key": "test_key_123"}
+
+    response = client.post("/optimize", json=payload, headers=headers)
+    assert response.status_code == 400
+
+
+def test_optimize_min_share_outside_items(client):
+    """Une part minimale sur une culture non sélectionnée renvoie une 422"""
+    payload = {
+        "Area": "France",
+        "Year": 2021,
+        "scenarios": [{"average_rain_fall_mm_per_year": 1000.0, "avg_temp": 20.0}],
+        "pesticide_levels": [0.0, 50.0],
+        "pesticide_budget": 10.0,
+        "items": ["Maize"],
+        "min_share_by_item": {"Wheat": 0.3}
+    }
+    headers = {"x-api-key": "test_key_123"}
+
+    response = client.post("/optimize", json=payload, headers=headers)
+    assert response.status_code == 422
+
+
+def test_rate_limit_per_key(client):
+    """Une clé de masse qui dépasse son budget reçoit un 429"""
+    import app as app_module
+    from src.admission import ApiClient, BULK
+
+    app_module.api_keys.clients["bulk_key"] = ApiClient("bulk", rate=0.001, burst=len(app.ITEMS), lane=BULK)
+    payload = {
+        "Area": "France",
+        "Year": 2021,
+        "average_rain_fall_mm_per_year": 1000.0,
+        "avg_temp": 20.0,
+        "pesticides_tonnes": 50.0
+    }
+    headers = {"x-api-key": "bulk_key"}
+
+    try:
+        first = client.post("/recommend", json=payload, headers=headers)
+        assert first.status_code == 200
+
+        second = client.post("/recommend", json=payload, headers=headers)
+        assert second.status_code == 429
+        assert "Retry-After" in second.headers
+    finally:
+        del app_module.api_keys.clients["bulk_key"]
+
+
+def test_overloaded_refunds_cost(client, monkeypatch):
+    """Un 503 (file pleine) rend le coût : la nouvelle tentative n'est pas limitée"""
+    import app as app_module
+    from src.admission import ApiClient, BULK, Overloaded
+
+    app_module.api_keys.clients["bulk_key"] = ApiClient("bulk", rate=0.001, burst=len(app.ITEMS), lane=BULK)
+    payload = {
+        "Area": "France",
+        "Year": 2021,
+        "average_rain_fall_mm_per_year": 1000.0,
+        "avg_temp": 20.0,
+        "pesticides_tonnes": 50.0
+    }
+    headers = {"x-api-key": "bulk_key"}
+
+    async def overloaded(*args):
+        raise Overloaded("Serveur surchargé, réessayer plus tard")
+
+    try:
+        with monkeypatch.context() as m:
+            m.setattr(app_module.scheduler, "run", overloaded)
+            shed = client.post("/recommend", json=payload, headers=headers)
+        assert shed.status_code == 503
+
+        retry = client.post("/recommend", json=payload, headers=headers)
+        assert retry.status_code == 200
+    finally:
+        del app_module.api_keys.clients["bulk_key"]
+
+
+def test_optimize_then_predict_default_key(client):
+    """Une grosse optimisation ne bloque pas la clé historique utilisée par le frontend"""
+    payload = {
+        "Area": "France",
+        "Year": 2021,
+        "scenarios": [{"average_rain_fall_mm_per_year": 500.0 + 10 * i, "avg_temp": 20.0} for i in range(100)],
+        "pesticide_levels": [0.0, 25.0, 50.0, 75.0, 100.0],
+        "pesticide_budget": 60.0,
+    }
+    headers = {"x-api-key": "test_key_123"}
+
+    optimized = client.post("/optimize", json=payload, headers=headers)
+    assert optimized.status_code == 200
+
+    predicted = client.post("/predict", json={
+        "Area": "France",
+        "Item": "Maize",
+        "Year": 2021,
+        "average_rain_fall_mm_per_year": 1000.0,
+        "avg_temp": 20.0,
+        "pesticides_tonnes": 50.0
+    }, headers=headers)
+    assert predicted.status_code == 200
@@ -1,7 +1,7 @@
 import pytest
 import pandas as pd
 import numpy as np
-from src.feature_engineering import add_features
+from src.feature_engineering import add_features, prepare_features
 
 def test_add_features_logic():
     """Test que les features sont bien calculées"""
@@ -40,3 +40,31 @@ def test_add_features_empty():
     df_res = add_features(df)
     assert df_res.empty
     assert "water_stress" in df_res.columns
+
+def test_prepare_features():
+    """Test de la préparation complète (log1p + cluster + interactions)"""
+    df = pd.DataFrame({
+        "Area": ["France"],
+        "Item": ["Maize"],
+        "Year": [2020],
+        "average_rain_fall_mm_per_year": [1000.0],
+        "avg_temp": [25.0],
+        "pesticides_tonnes": [100.0],
+    })
+    df_res = prepare_features(df, {"France": 2})
+
+    assert "pesticides_tonnes" not in df_res.columns
+    assert df_res["pesticides_tonnes_log"].iloc[0] == pytest.approx(np.log1p(100))
+    assert df_res["climate_cluster"].iloc[0] == 2
+    assert "water_stress" in df_res.columns
+
+def test_prepare_features_unknown_area():
+    """Un pays absent du mapping lève une ValueError"""
+    df = pd.DataFrame({
+        "Area": ["France", "Atlantis"],
+        "average_rain_fall_mm_per_year": [1000.0, 1000.0],
+        "avg_temp": [25.0, 25.0],
+        "pesticides_tonnes": [100.0, 100.0],
+    })
+    with pytest.raises(ValueError, match="Atlantis"):
+        prepare_features(df, {"France": 2})
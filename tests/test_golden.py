@@ -0,0 +1,182 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from src.golden import (
+    EDGE_CASES, generate_golden_inputs, predict_rows_safe, non_finite_feature_rows, infinite_feature_rows,
+    record_golden, load_golden, check_backend, DEFAULT_PATH
+)
+
+AREAS = ["France", "India", "Mali"]
+ITEMS = ["Maize", "Wheat"]
+
+
+def fake_predict(df):
+    """Modèle factice qui, comme le vrai pipeline, rejette les features infinies mais accepte les NaN"""
+    if infinite_feature_rows(df).any():
+        raise ValueError("Input contains infinity")
+    rain = df["average_rain_fall_mm_per_year"].to_numpy()
+    return rain * 2 + df["avg_temp"].to_numpy() + np.log1p(df["pesticides_tonnes"].to_numpy())
+
+
+def counting(predict_fn):
+    calls = []
+
+    def wrapper(df):
+        calls.append(len(df))
+        return predict_fn(df)
+
+    return wrapper, calls
+
+
+def test_generate_inputs_stratified():
+    """Chaque paire (Area, Item) reçoit les tirages et les valeurs limites"""
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=5, seed=1)
+    per_stratum = 5 + len(EDGE_CASES)
+    assert len(df) == len(AREAS) * len(ITEMS) * per_stratum
+    counts = df.groupby(["Area", "Item"]).size()
+    assert (counts == per_stratum).all()
+    assert (df["average_rain_fall_mm_per_year"] == 0).any()
+    assert (df["avg_temp"] < 0).any()
+    assert df["pesticides_tonnes"].max() >= 1e9
+
+
+def test_generate_inputs_deterministic():
+    a = generate_golden_inputs(AREAS, ITEMS, seed=3)
+    b = generate_golden_inputs(AREAS, ITEMS, seed=3)
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_predict_rows_safe_isolates_errors():
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=2)
+    preds = predict_rows_safe(fake_predict, df)
+    rain = df["average_rain_fall_mm_per_year"].to_numpy()
+    invalid = (rain == 0) | (df["avg_temp"] == 0).to_numpy()
+    np.testing.assert_array_equal(non_finite_feature_rows(df), invalid)
+    # pluie et pesticides nuls : features NaN, acceptées par le pipeline
+    accepted = (rain == 0) & (df["pesticides_tonnes"] == 0).to_numpy()
+    assert accepted.any()
+    assert np.isnan(preds[invalid & ~accepted]).all()
+    assert np.isfinite(preds[~invalid | accepted]).all()
+
+
+def test_predict_rows_safe_mixed_non_finite_rows():
+    """Une ligne à features infinies rejetée ne fait pas échouer les lignes à features NaN du même chunk"""
+    df = pd.DataFrame({
+        "Area": ["France"] * 3, "Item": ["Maize"] * 3, "Year": [2000] * 3,
+        "average_rain_fall_mm_per_year": [0.0, 0.0, 800.0],
+        "avg_temp": [20.0, 20.0, 15.0],
+        "pesticides_tonnes": [0.0, 5.0, 10.0],
+    })
+    preds = predict_rows_safe(fake_predict, df)
+    assert preds[0] == pytest.approx(20.0)
+    assert np.isnan(preds[1])
+    assert np.isfinite(preds[2])
+
+
+def test_predict_rows_safe_stays_vectorized():
+    """Les valeurs limites n'entraînent pas de repli ligne par ligne"""
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=2000)
+    predict, calls = counting(fake_predict)
+    timings = {}
+    preds = predict_rows_safe(predict, df, timings)
+
+    # un batch pour les lignes valides, un pour les features NaN, un pour les features infinies
+    assert len(calls) == 3
+    assert timings["batch_rows"] + timings["error_rows"] == len(df)
+    n_accepted_suspect = len(AREAS) * len(ITEMS)
+    assert np.isfinite(preds).sum() == timings["batch_rows"] + n_accepted_suspect
+
+
+def test_predict_rows_safe_bisects_unexpected_errors():
+    """Une erreur inattendue est isolée par dichotomie, pas ligne par ligne"""
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=500)
+
+    # seules trois lignes Mali/Wheat sont rejetées
+    target = df.index[(df["Area"] == "Mali") & (df["Item"] == "Wheat")][:3]
+
+    def rejects_three(d):
+        if d.index.isin(target).any():
+            raise ValueError("Pays inconnu : Mali")
+        return fake_predict(d)
+
+    predict, calls = counting(rejects_three)
+    preds = predict_rows_safe(predict, df)
+
+    assert np.isnan(preds[target]).all()
+    valid = ~non_finite_feature_rows(df)
+    valid[target] = False
+    assert np.isfinite(preds[valid]).all()
+    assert len(calls) < 100
+
+
+def test_record_and_load_roundtrip(tmp_path):
+    path = tmp_path / "golden.npz"
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=4)
+    preds = record_golden(df, fake_predict, path, chunk_size=10, extra_meta={"seed": 0})
+
+    inputs, reference, meta = load_golden(path)
+    pd.testing.assert_frame_equal(inputs, df)
+    np.testing.assert_array_equal(reference, preds)
+    assert meta["seed"] == 0
+
+
+def test_check_backend_identical_passes():
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=4)
+    reference = predict_rows_safe(fake_predict, df)
+    report = check_backend(df, reference, fake_predict, chunk_size=7, n_jobs=2)
+    assert report["passed"]
+    assert report["n_failed"] == 0
+    assert report["max_abs_diff"] == 0.0
+
+
+def test_check_backend_reports_worst_deviation():
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=4)
+    reference = predict_rows_safe(fake_predict, df)
+
+    def drifted(d):
+        out = fake_predict(d).copy()
+        out[(d["Area"] == "Mali").to_numpy()] += 5.0
+        return out
+
+    report = check_backend(df, reference, drifted, atol=1e-3, top_k=3)
+    assert not report["passed"]
+    assert report["max_abs_diff"] == pytest.approx(5.0)
+    assert all(row["Area"] == "Mali" for row in report["worst"])
+
+
+def test_check_backend_error_mismatch():
+    """Un backend qui ne lève plus d'erreur sur une entrée invalide est signalé"""
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=2)
+    reference = predict_rows_safe(fake_predict, df)
+
+    def lenient(d):
+        rain = d["average_rain_fall_mm_per_year"].to_numpy()
+        return rain * 2 + d["avg_temp"].to_numpy() + np.log1p(d["pesticides_tonnes"].to_numpy())
+
+    report = check_backend(df, reference, lenient)
+    # pluie nulle et température nulle dans chaque strate
+    assert report["n_error_mismatch"] == 2 * len(AREAS) * len(ITEMS)
+    assert not report["passed"]
+
+
+def test_check_backend_call_count():
+    """Le vérificateur reste en batches : au plus trois appels par chunk"""
+    df = generate_golden_inputs(AREAS, ITEMS, samples_per_stratum=2500)
+    reference = predict_rows_safe(fake_predict, df)
+    predict, calls = counting(fake_predict)
+
+    report = check_backend(df, reference, predict, chunk_size=2048, n_jobs=2)
+    n_chunks = -(-len(df) // 2048)
+    assert report["passed"]
+    assert len(calls) <= 3 * n_chunks
+
+
+@pytest.mark.skipif(not os.path.exists(DEFAULT_PATH), reason="référence golden non enregistrée")
+def test_pipeline_matches_golden():
+    """Le pipeline servi par l'API reproduit les prédictions de référence"""
+    import app
+
+    inputs, reference, _ = load_golden(DEFAULT_PATH)
+    report = check_backend(inputs, reference, app.predict_batch, name="batch")
+    assert report["passed"], report["worst"][:3]
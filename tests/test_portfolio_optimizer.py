@@ -0,0 +1,123 @@
+import pytest
+import numpy as np
+from src.portfolio_optimizer import (
+    PredictionCache, build_grid, evaluate_grid, solve_allocation, optimize_portfolio
+)
+
+ITEMS = ["Maize", "Wheat", "Rice, paddy"]
+SCENARIOS = [
+    {"average_rain_fall_mm_per_year": 500.0, "avg_temp": 15.0},
+    {"average_rain_fall_mm_per_year": 1000.0, "avg_temp": 20.0},
+    {"average_rain_fall_mm_per_year": 1500.0, "avg_temp": 25.0},
+]
+
+
+def fake_predict(df):
+    """Modèle factice : rendement dépendant de la culture, de la pluie et des pesticides"""
+    base = df["Item"].map({"Maize": 3.0, "Wheat": 2.0, "Rice, paddy": 1.0}).to_numpy()
+    return base * df["average_rain_fall_mm_per_year"].to_numpy() + 10 * np.log1p(df["pesticides_tonnes"].to_numpy())
+
+
+def test_build_grid_order():
+    """La grille respecte l'ordre scénario x culture x pesticides"""
+    grid = build_grid("France", 2020, SCENARIOS, ITEMS, [0.0, 10.0])
+    assert len(grid) == 3 * 3 * 2
+    assert list(grid.columns)[:2] == ["Area", "Item"]
+    assert grid.iloc[0]["Item"] == "Maize"
+    assert grid.iloc[1]["pesticides_tonnes"] == 10.0
+    assert grid.iloc[2]["Item"] == "Wheat"
+    assert grid.iloc[6]["average_rain_fall_mm_per_year"] == 1000.0
+
+
+def test_evaluate_grid_matches_row_by_row():
+    """Le batch vectorisé donne les mêmes valeurs que ligne par ligne"""
+    levels = [0.0, 10.0]
+    yields, _ = evaluate_grid("France", 2020, SCENARIOS, ITEMS, levels, fake_predict)
+    grid = build_grid("France", 2020, SCENARIOS, ITEMS, levels)
+    expected = np.array([fake_predict(grid.iloc[[i]])[0] for i in range(len(grid))])
+    assert yields.shape == (3, 3, 2)
+    np.testing.assert_allclose(yields.ravel(), expected)
+
+
+def test_prediction_cache():
+    """Les lignes déjà vues ne sont pas réévaluées"""
+    calls = []
+
+    def counting_predict(df):
+        calls.append(len(df))
+        return fake_predict(df)
+
+    cache = PredictionCache()
+    grid = build_grid("France", 2020, SCENARIOS, ITEMS, [0.0, 10.0])
+    first, first_hits = cache.predict(grid, counting_predict)
+    second, second_hits = cache.predict(grid, counting_predict)
+
+    np.testing.assert_allclose(first, second)
+    assert calls == [18]
+    assert (first_hits, second_hits) == (0, 18)
+    assert cache.hits == 18
+    assert cache.misses == 18
+
+
+def test_solve_allocation_best_crop_without_constraints():
+    """Sans contrainte, toute la surface va à la meilleure culture"""
+    yields, _ = evaluate_grid("France", 2020, SCENARIOS, ITEMS, [0.0], fake_predict)
+    sol = solve_allocation(yields, [0.0], pesticide_budget=0.0, min_shares=[0, 0, 0])
+    assert sol["shares"][0, 0] == pytest.approx(1.0)
+
+
+def test_solve_allocation_min_share_and_budget():
+    """Les parts minimales et le budget de pesticides sont respectés"""
+    levels = [0.0, 100.0]
+    yields, _ = evaluate_grid("France", 2020, SCENARIOS, ITEMS, levels, fake_predict)
+    sol = solve_allocation(yields, levels, pesticide_budget=20.0, min_shares=[0, 0.3, 0.2])
+    shares = sol["shares"]
+
+    assert shares.sum() == pytest.approx(1.0)
+    assert shares[1].sum() >= 0.3 - 1e-9
+    assert shares[2].sum() >= 0.2 - 1e-9
+    assert (shares * np.array(levels)).sum() <= 20.0 + 1e-9
+    # le budget est saturé : sa valeur marginale est positive
+    assert sol["budget_shadow_price"] > 0
+
+
+def test_solve_allocation_infeasible():
+    yields, _ = evaluate_grid("France", 2020, SCENARIOS, ITEMS, [10.0], fake_predict)
+    with pytest.raises(ValueError):
+        solve_allocation(yields, [10.0], pesticide_budget=5.0, min_shares=[0, 0, 0])
+    with pytest.raises(ValueError):
+        solve_allocation(yields, [10.0], pesticide_budget=50.0, min_shares=[0.5, 0.5, 0.5])
+
+
+def test_optimize_portfolio_output():
+    result = optimize_portfolio(
+        area="France",
+        year=2020,
+        scenarios=SCENARIOS,
+        items=ITEMS,
+        pesticide_levels=[0.0, 50.0],
+        pesticide_budget=25.0,
+        min_shares=[0.0, 0.1, 0.0],
+        predict_fn=fake_predict,
+        total_area_ha=200.0,
+        cache=PredictionCache(),
+    )
+    assert sum(p["area_ha"] for p in result["plan"]) == pytest.approx(200.0)
+    assert set(result["sensitivity"]["min_share_shadow_prices"]) == set(ITEMS)
+    assert result["sensitivity"]["scenario_yields"]["worst"] <= result["expected_yield_hg_ha"]
+    assert result["stats"]["n_evaluations"] == 3 * 3 * 2
+
+
+def test_optimize_portfolio_cache_hits_per_call():
+    """Les hits rapportés sont ceux de l'appel, pas le compteur global du cache"""
+    cache = PredictionCache()
+    kwargs = dict(area="France", year=2020, items=ITEMS, pesticide_levels=[0.0, 50.0],
+                  pesticide_budget=25.0, min_shares=[0, 0, 0], predict_fn=fake_predict, cache=cache)
+
+    first = optimize_portfolio(scenarios=SCENARIOS, **kwargs)
+    # un autre scénario, partiellement en cache
+    second = optimize_portfolio(scenarios=SCENARIOS[:1] + [{"average_rain_fall_mm_per_year": 42.0, "avg_temp": 5.0}], **kwargs)
+
+    assert first["stats"]["cache_hits"] == 0
+    assert second["stats"]["cache_hits"] == 3 * 2
+    assert cache.hits == 3 * 2
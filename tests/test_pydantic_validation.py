@@ -1,6 +1,6 @@
 import pytest
 from pydantic import ValidationError
-from src.pydantic_validaton import InputData, RecommendInput
+from src.pydantic_validaton import InputData, RecommendInput, OptimizeInput
 from unittest.mock import patch
 
 class TestInputData:
@@ -87,3 +87,34 @@ class TestRecommendInput:
         model = RecommendInput(**data)
         assert model.Area == "France"
         # RecommendInput n'a pas de champ Item
+
+class TestOptimizeInput:
+    base_data = {
+        "Area": "France",
+        "Year": 2020,
+        "scenarios": [{"average_rain_fall_mm_per_year": 800.0, "avg_temp": 15.5}],
+        "pesticide_levels": [0.0, 100.0],
+        "pesticide_budget": 50.0,
+    }
+
+    @patch("src.pydantic_validaton.get_allowed_items")
+    def test_min_share_unknown_item(self, mock_items):
+        """Une part minimale sur une culture inconnue est rejetée"""
+        mock_items.return_value = ["Maize", "Wheat"]
+        with pytest.raises(ValidationError) as exc:
+            OptimizeInput(**self.base_data, min_share_by_item={"Mazie": 0.2})
+        assert "Mazie" in str(exc.value)
+
+    def test_min_share_item_not_selected(self):
+        """Une part minimale sur une culture exclue via items est rejetée"""
+        with pytest.raises(ValidationError):
+            OptimizeInput(**self.base_data, items=["Maize"], min_share_by_item={"Wheat": 0.2})
+
+        model = OptimizeInput(**self.base_data, items=["Maize", "Wheat"], min_share_by_item={"Wheat": 0.2})
+        assert model.min_share_by_item == {"Wheat": 0.2}
+
+    def test_duplicate_items(self):
+        """Une culture sélectionnée deux fois est rejetée"""
+        with pytest.raises(ValidationError) as exc:
+            OptimizeInput(**self.base_data, items=["Maize", " Maize"])
+        assert "double" in str(exc.value)
@@ -0,0 +1,156 @@
+import json
+import joblib
+import pytest
+import numpy as np
+from src.replay import iter_capture_rows, load_capture_index, ArtifactSet, replay, format_report
+
+
+class FakeModel:
+    """Modèle factice picklable : prédit log1p(scale * pluie + cluster)"""
+
+    def __init__(self, scale):
+        self.scale = scale
+
+    def predict(self, df):
+        return np.log1p(self.scale * df["average_rain_fall_mm_per_year"].to_numpy() + df["climate_cluster"].to_numpy())
+
+
+class StrictModel(FakeModel):
+    """Comme le vrai pipeline : rejette les features infinies, accepte les NaN"""
+
+    def predict(self, df):
+        if np.isinf(df.select_dtypes("number").to_numpy(dtype=float)).any():
+            raise ValueError("Input contains infinity")
+        return super().predict(df)
+
+
+def make_artifacts(directory, scale, country_to_cluster=None, model_cls=FakeModel):
+    directory.mkdir()
+    joblib.dump(model_cls(scale), directory / "final_model.pkl")
+    joblib.dump(country_to_cluster or {"France": 1, "Mali": 2}, directory / "country_to_cluster.pkl")
+    return str(directory)
+
+
+def base_input(**kwargs):
+    row = {"Area": "France", "Year": 2020, "average_rain_fall_mm_per_year": 1000.0,
+           "avg_temp": 20.0, "pesticides_tonnes": 10.0}
+    row.update(kwargs)
+    return row
+
+
+@pytest.fixture
+def capture(tmp_path):
+    path = tmp_path / "audit.ndjson"
+    records = [
+        {"ts": 0, "endpoint": "predict", "input": base_input(Item="Maize"), "output": 1001.0, "latency_ms": 2.0},
+        {"ts": 1, "endpoint": "recommend", "input": base_input(Area="Mali", average_rain_fall_mm_per_year=500.0),
+         "output": {"Maize": 502.0, "Wheat": 502.0}, "latency_ms": 20.0},
+        {"ts": 2, "endpoint": "optimize", "input": {}, "output": {}},
+        {"ts": 3, "endpoint": "predict", "input": base_input(Item="Wheat", average_rain_fall_mm_per_year=0.0),
+         "output": 1.0, "latency_ms": 1.0},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_iter_capture_rows_expands_recommend(capture):
+    rows = list(iter_capture_rows(capture))
+    assert [r["endpoint"] for r in rows] == ["predict", "recommend", "recommend", "predict"]
+    assert [r["Item"] for r in rows] == ["Maize", "Maize", "Wheat", "Wheat"]
+    assert rows[1]["request_id"] == rows[2]["request_id"]
+    assert rows[2]["recorded"] == 502.0
+
+
+def test_load_capture_index(capture):
+    rows = load_capture_index(capture)
+    assert list(rows.columns) == ["Area", "Item", "request_id", "recorded", "recorded_latency_ms"]
+    assert rows["Item"].tolist() == ["Maize", "Maize", "Wheat", "Wheat"]
+    assert rows["recorded"].tolist() == [1001.0, 502.0, 502.0, 1.0]
+
+
+def test_artifact_set_predict(tmp_path, capture):
+    artifacts = ArtifactSet(make_artifacts(tmp_path / "v1", 1.0))
+    rows = list(iter_capture_rows(capture))
+    import pandas as pd
+    preds = artifacts.predict(pd.DataFrame(rows[:1]))
+    assert preds[0] == pytest.approx(1001.0)
+
+
+@pytest.mark.parametrize("n_workers", [0, 2])
+def test_replay_compares_models(tmp_path, capture, n_workers):
+    models = {
+        "v1": make_artifacts(tmp_path / "v1", 1.0),
+        "v2": make_artifacts(tmp_path / "v2", 2.0),
+    }
+    report = replay(capture, models, batch_size=2, n_workers=n_workers)
+
+    assert report["n_requests"] == 3
+    assert report["n_rows"] == 4
+    assert report["models"]["v1"]["n_rows"] == 4
+    assert "p99" in report["models"]["v2"]["batch_latency_ms"]
+    # la ligne à pluie nulle (features non finies) est évaluée hors du chemin vectorisé
+    assert report["models"]["v1"]["error_path"]["rows"] == 1
+    assert report["models"]["v1"]["wall_rows_per_s"] > 0
+    assert report["recorded_latency_ms"]["max"] == 20.0
+
+    deltas = report["deltas"]["v2 vs v1"]
+    # v2 - v1 = rain : 1000 pour France/Maize, 500 pour Mali
+    assert deltas.loc[("France", "Maize"), "mean_delta"] == pytest.approx(1000.0)
+    assert deltas.loc[("Mali", "Wheat"), "mean_delta"] == pytest.approx(500.0)
+
+    # v1 reproduit la production sauf la ligne à pluie nulle (1.0 enregistré)
+    vs_recorded = report["deltas_vs_recorded"]["v1"]
+    assert vs_recorded.loc[("Mali", "Maize"), "max_abs_delta"] == pytest.approx(0.0)
+    assert "v1" in format_report(report)
+
+
+def test_replay_empty_capture(tmp_path):
+    path = tmp_path / "empty.ndjson"
+    path.write_text("", encoding="utf-8")
+    with pytest.raises(ValueError):
+        replay(str(path), {"v1": make_artifacts(tmp_path / "v1", 1.0)}, n_workers=0)
+
+
+@pytest.mark.parametrize("n_workers", [0, 2])
+def test_replay_error_path_timed_separately(tmp_path, capture, n_workers):
+    # le candidat ne connaît pas le Mali : ses lignes échouent sans ralentir le chemin vectorisé
+    models = {
+        "v1": make_artifacts(tmp_path / "v1", 1.0),
+        "v2": make_artifacts(tmp_path / "v2", 1.0, country_to_cluster={"France": 1}),
+    }
+    report = replay(capture, models, batch_size=1, n_workers=n_workers)
+
+    stats = report["models"]["v2"]
+    assert stats["n_errors"] == 2
+    # 2 lignes Mali + la ligne à pluie nulle passent par le chemin d'erreur
+    assert stats["error_path"]["rows"] == 3
+    assert stats["error_path"]["batches"] == 3
+    # latences et débit vectorisés ne portent que sur la ligne France/Maize
+    assert stats["batch_latency_ms"]["p50"] == stats["batch_latency_ms"]["max"]
+    assert stats["rows_per_s"] > 0
+    assert "chemin d'erreur" in format_report(report)
+
+
+def test_replay_mixed_non_finite_chunk(tmp_path):
+    """Une ligne à features infinies rejetée ne compte pas les lignes à features NaN du lot comme erreurs"""
+    path = tmp_path / "audit.ndjson"
+    records = [
+        {"ts": 0, "endpoint": "predict", "output": 3.0,
+         "input": base_input(Item="Maize", average_rain_fall_mm_per_year=0.0, pesticides_tonnes=0.0)},
+        {"ts": 1, "endpoint": "predict", "output": None,
+         "input": base_input(Item="Maize", average_rain_fall_mm_per_year=0.0, pesticides_tonnes=5.0)},
+        {"ts": 2, "endpoint": "predict", "output": 1001.0, "input": base_input(Item="Wheat")},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+    models = {
+        "v1": make_artifacts(tmp_path / "v1", 1.0, model_cls=StrictModel),
+        "v2": make_artifacts(tmp_path / "v2", 2.0, model_cls=StrictModel),
+    }
+    report = replay(str(path), models, batch_size=3, n_workers=0)
+
+    assert report["models"]["v1"]["n_errors"] == 1
+    assert report["models"]["v1"]["error_path"]["rows"] == 2
+    # pluie nulle : v1 et v2 prédisent la même valeur pour la ligne à features NaN
+    deltas = report["deltas"]["v2 vs v1"]
+    assert deltas.loc[("France", "Maize"), "n"] == 2
+    assert deltas.loc[("France", "Maize"), "mean_delta"] == pytest.approx(0.0)
@@ -0,0 +1,147 @@
+import json
+import logging
+import pytest
+from src.request_logging import AsyncRequestLogger, _parse_mapping, _parse_level
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def capture():
+    logger = logging.getLogger("test-request-logging")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+    yield logger, handler
+    logger.removeHandler(handler)
+
+
+def test_parse_mapping():
+    assert _parse_mapping("predict=0.5, recommend=0.1", float) == {"predict": 0.5, "recommend": 0.1}
+    assert _parse_mapping(None, float) == {}
+    assert _parse_mapping("predict=WARNING", _parse_level) == {"predict": logging.WARNING}
+
+
+def test_records_written_by_background_thread(capture):
+    logger, handler = capture
+    request_logger = AsyncRequestLogger(logger)
+    request_logger.info("predict", "Prédiction effectuée", prediction=42.0)
+    request_logger.flush()
+
+    assert len(handler.records) == 1
+    record = handler.records[0]
+    assert record.threadName == "request-logger"
+    assert "predict | Prédiction effectuée" in record.getMessage()
+    assert '"prediction": 42.0' in record.getMessage()
+    request_logger.close()
+
+
+def test_record_keeps_request_timestamp(capture):
+    """asctime reflète l'heure de la requête, pas celle de l'écriture différée"""
+    logger, handler = capture
+    request_logger = AsyncRequestLogger(logger)
+    request_logger._write_log(("log", 1_000_000.25, "predict", logging.INFO, "ancienne requête", {}))
+
+    record = handler.records[0]
+    assert record.created == 1_000_000.25
+    assert record.msecs == pytest.approx(250.0)
+    request_logger.close()
+
+
+def test_level_per_endpoint(capture):
+    logger, handler = capture
+    request_logger = AsyncRequestLogger(logger, levels={"recommend": logging.WARNING})
+    request_logger.info("recommend", "filtré")
+    request_logger.warning("recommend", "conservé")
+    request_logger.info("predict", "conservé")
+    request_logger.flush()
+
+    messages = [r.getMessage() for r in handler.records]
+    assert messages == ["recommend | conservé", "predict | conservé"]
+    request_logger.close()
+
+
+def test_sampling_keeps_warnings(capture):
+    logger, handler = capture
+    request_logger = AsyncRequestLogger(logger, sample_rates={"recommend": 0.0})
+    for _ in range(50):
+        request_logger.info("recommend", "échantillonné")
+    request_logger.warning("recommend", "toujours conservé")
+    request_logger.flush()
+
+    assert [r.getMessage() for r in handler.records] == ["recommend | toujours conservé"]
+    request_logger.close()
+
+
+def test_full_queue_drops_instead_of_blocking(capture):
+    logger, _ = capture
+    request_logger = AsyncRequestLogger(logger, max_queue=1)
+    request_logger.close()  # thread arrêté : la file ne se vide plus
+    for _ in range(5):
+        request_logger.info("predict", "perdu")
+    assert request_logger.dropped >= 4
+
+
+def test_audit_ndjson(tmp_path, capture):
+    logger, _ = capture
+    path = tmp_path / "audit" / "audit.ndjson"
+    request_logger = AsyncRequestLogger(logger, audit_path=str(path))
+    request_logger.audit("predict", {"Area": "France", "Item": "Maize"}, 1234.5, latency_ms=3.2)
+    request_logger.audit("recommend", {"Area": "France"}, {"Maize": 1.0, "Wheat": 2.0})
+    request_logger.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["endpoint"] for line in lines] == ["predict", "recommend"]
+    assert lines[0]["input"]["Item"] == "Maize"
+    assert lines[0]["output"] == 1234.5
+    assert lines[0]["latency_ms"] == 3.2
+    assert lines[1]["output"]["Wheat"] == 2.0
+
+
+def test_audit_disabled_without_path(capture):
+    logger, handler = capture
+    request_logger = AsyncRequestLogger(logger)
+    request_logger.audit("predict", {"Area": "France"}, 1.0)
+    request_logger.flush()
+    assert handler.records == []
+    request_logger.close()
+
+
+def test_drops_reported_by_writer(capture):
+    """Les abandons sous charge sont signalés par un warning du thread d'écriture"""
+    import threading
+
+    logger, handler = capture
+    entered, release = threading.Event(), threading.Event()
+
+    class SlowHandler(logging.Handler):
+        def emit(self, record):
+            if record.getMessage().endswith("premier"):
+                entered.set()
+                release.wait(5)
+
+    slow = SlowHandler()
+    logger.addHandler(slow)
+    try:
+        request_logger = AsyncRequestLogger(logger, max_queue=2, drop_report_interval=0)
+        request_logger.info("predict", "premier")
+        assert entered.wait(5)
+        for _ in range(10):
+            request_logger.info("predict", "suivant")
+        release.set()
+        request_logger.flush()
+
+        assert request_logger.dropped == 8
+        warnings = [r.getMessage() for r in handler.records if r.levelno == logging.WARNING]
+        assert warnings == ["8 enregistrements de log abandonnés (file pleine), 8 au total"]
+        request_logger.close()
+    finally:
+        logger.removeHandler(slow)